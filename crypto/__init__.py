@@ -1,3 +1,6 @@
-__all__ = ["aes", "ecc", "rsa"]
+__all__ = ["aes", "ecc", "rsa", "configure_async", "shutdown_workers", "instrument"]
 
 from .src import aes, ecc, rsa
+from ._async import configure as configure_async
+from ._pool import shutdown as shutdown_workers
+from . import instrument
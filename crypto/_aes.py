@@ -1,9 +1,39 @@
 # pylint: disable=import-outside-toplevel
+from . import _async
+
+# How much data is read from streams at once
+CHUNK_SIZE = 64 * 1024
+
+
+def _feed_stream(context, in_stream, out_stream, chunk_size):
+    while True:
+        chunk = in_stream.read(chunk_size)
+        if not chunk:
+            break
+        out_stream.write(context.update(chunk))
+    out_stream.write(context.finalize())
+
+
+# The first AES object created for each backend type, used to unpickle AES
+# objects by reference, e.g. in worker processes
+_aes_instances = {}
+
+
+def _load_aes(backend_type):
+    return _aes_instances[backend_type]
+
 
 class AES:
     def __init__(self, backend, fallback=None):
         self._backend = backend
         self._fallback = fallback
+        _aes_instances.setdefault(type(backend), self)
+
+
+    def __reduce__(self):
+        if _aes_instances.get(type(self._backend)) is not self:
+            raise TypeError("Only module-level AES objects can be pickled")
+        return _load_aes, (type(self._backend),)
 
 
     def get_key_length(self, algo):
@@ -23,16 +53,19 @@ class AES:
         return self._backend.random(self.get_key_length(algo))
 
 
+    def _check_key(self, key, algo):
+        key_length = self.get_key_length(algo)
+        if len(key) != key_length:
+            raise ValueError("Expected key to be {} bytes, got {} bytes".format(key_length, len(key)))
+
+
     def decrypt(self, ciphertext, iv, key, algo="aes-256-cbc"):
         if not self._backend.is_algo_supported(algo):
             if self._fallback is None:
                 raise ValueError("This algorithm is not supported")
             return self._fallback.decrypt(ciphertext, iv, key, algo)
 
-        key_length = self.get_key_length(algo)
-        if len(key) != key_length:
-            raise ValueError("Expected key to be {} bytes, got {} bytes".format(key_length, len(key)))
-
+        self._check_key(key, algo)
         return self._backend.decrypt(ciphertext, iv, key, algo)
 
 
@@ -42,13 +75,50 @@ class AES:
                 raise ValueError("This algorithm is not supported")
             return self._fallback.encrypt(data, key, algo)
 
-        key_length = self.get_key_length(algo)
-        if len(key) != key_length:
-            raise ValueError("Expected key to be {} bytes, got {} bytes".format(key_length, len(key)))
-
+        self._check_key(key, algo)
         return self._backend.encrypt(data, key, algo)
 
 
+    def decryptor(self, iv, key, algo="aes-256-cbc"):
+        if not self._backend.is_algo_supported(algo):
+            if self._fallback is None:
+                raise ValueError("This algorithm is not supported")
+            return self._fallback.decryptor(iv, key, algo)
+
+        self._check_key(key, algo)
+        return self._backend.decryptor(iv, key, algo)
+
+
+    def encryptor(self, key, algo="aes-256-cbc"):
+        if not self._backend.is_algo_supported(algo):
+            if self._fallback is None:
+                raise ValueError("This algorithm is not supported")
+            return self._fallback.encryptor(key, algo)
+
+        self._check_key(key, algo)
+        return self._backend.encryptor(key, algo)
+
+
+    def decrypt_stream(
+        self, in_stream, out_stream, iv, key, algo="aes-256-cbc", chunk_size=CHUNK_SIZE
+    ):
+        _feed_stream(self.decryptor(iv, key, algo), in_stream, out_stream, chunk_size)
+
+
+    def encrypt_stream(self, in_stream, out_stream, key, algo="aes-256-cbc", chunk_size=CHUNK_SIZE):
+        encryptor = self.encryptor(key, algo)
+        _feed_stream(encryptor, in_stream, out_stream, chunk_size)
+        return encryptor.iv
+
+
+    async def adecrypt(self, ciphertext, iv, key, algo="aes-256-cbc"):
+        return await _async.run(self.decrypt, ciphertext, iv, key, algo)
+
+
+    async def aencrypt(self, data, key, algo="aes-256-cbc"):
+        return await _async.run(self.encrypt, data, key, algo)
+
+
     def get_backend(self):
         return self._backend.get_backend()
 
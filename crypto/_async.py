@@ -0,0 +1,115 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import weakref
+
+
+__all__ = ["configure", "uses_processes", "run", "verify"]
+
+
+# How many jobs may be running in the executor at once. Further calls wait
+# for a free slot instead of piling up in the executor's queue
+MAX_PENDING = 64
+# Concurrent verify calls are coalesced into verify_batch calls of at most
+# this many signatures
+VERIFY_BATCH_SIZE = 64
+
+
+_executor = None
+_max_pending = MAX_PENDING
+_verify_batch_size = VERIFY_BATCH_SIZE
+# Semaphores and queues belong to an event loop
+_loop_states = weakref.WeakKeyDictionary()
+
+
+def configure(executor=None, max_pending=MAX_PENDING, verify_batch_size=VERIFY_BATCH_SIZE):
+    # executor=None means the loop's default executor. A process pool keeps
+    # the event loop responsive under heavy load; curves and AES objects are
+    # pickled by name, so workers reuse their own precomputed tables. Prepared
+    # public keys are sent to a process pool without their tables
+    global _executor, _max_pending, _verify_batch_size
+    _executor = executor
+    _max_pending = max_pending
+    _verify_batch_size = verify_batch_size
+    _loop_states.clear()
+
+
+def uses_processes():
+    # Arguments are only pickled when jobs go to another process
+    return isinstance(_executor, ProcessPoolExecutor)
+
+
+class _LoopState:
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(_max_pending)
+        self.verify_queues = {}
+        self.tasks = set()
+
+
+def _get_state(loop):
+    state = _loop_states.get(loop)
+    if state is None:
+        state = _loop_states[loop] = _LoopState()
+    return state
+
+
+async def run(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    async with _get_state(loop).semaphore:
+        return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+async def verify(curve, signature, data, public_key, hash):
+    # Signatures verified in the same loop iteration are checked together
+    loop = asyncio.get_running_loop()
+    state = _get_state(loop)
+    item = signature, data, curve._portable_public_key(public_key, uses_processes())
+    key = (curve, hash)
+    queue = state.verify_queues.get(key)
+    if queue is None:
+        queue = state.verify_queues[key] = []
+        loop.call_soon(_flush_verify, loop, state, key, queue)
+    future = loop.create_future()
+    queue.append((item, future))
+    if len(queue) >= _verify_batch_size:
+        _flush_verify(loop, state, key, queue)
+    if not await future:
+        raise ValueError("Invalid signature")
+    return True
+
+
+def _flush_verify(loop, state, key, queue):
+    if state.verify_queues.get(key) is not queue:
+        # Already flushed
+        return
+    del state.verify_queues[key]
+    task = loop.create_task(_verify_batch(key, queue))
+    # The loop only keeps weak references to tasks
+    state.tasks.add(task)
+    task.add_done_callback(state.tasks.discard)
+
+
+async def _verify_batch(key, queue):
+    curve, hash = key
+    try:
+        results = await run(curve.verify_batch, [item for item, _ in queue], hash=hash)
+    except Exception:  # pylint: disable=broad-except
+        # One bad request must not fail the rest of the batch, so check them
+        # one by one to find out which of them raises
+        for item, future in queue:
+            await _verify_single(curve, hash, item, future)
+        return
+    for (_, future), result in zip(queue, results):
+        if not future.done():
+            future.set_result(result)
+
+
+async def _verify_single(curve, hash, item, future):
+    try:
+        result, = await run(curve.verify_batch, [item], hash=hash)
+    except Exception as e:  # pylint: disable=broad-except
+        if not future.done():
+            future.set_exception(e)
+        return
+    if not future.done():
+        future.set_result(result)
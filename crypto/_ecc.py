@@ -1,7 +1,13 @@
 import hashlib
 import struct
 import hmac
+import itertools
+import tempfile
+import threading
 import base58
+from ._lru import LRUCache
+from . import _async, _pool
+from ._aes import CHUNK_SIZE, _feed_stream
 
 
 try:
@@ -11,10 +17,77 @@ except ValueError:
     from . import _ripemd
     def ripemd160(*args):
         return _ripemd.new(*args)
+    def ripemd160_many(messages):
+        return _ripemd.ripemd160_many(messages)
 else:
     # Use OpenSSL
     def ripemd160(*args):
         return hashlib.new("ripemd160", *args)
+    def ripemd160_many(messages):
+        return [hashlib.new("ripemd160", message).digest() for message in messages]
+
+
+def hash160_many(messages):
+    # RIPEMD160(SHA256(message)) for every message
+    return ripemd160_many([hashlib.sha256(message).digest() for message in messages])
+
+
+# How many decoded public keys each curve remembers by default
+PUBLIC_KEY_CACHE_SIZE = 256
+# How many key pairs generate_keypairs normalizes with one inversion
+KEYPAIR_BATCH_SIZE = 256
+# From how many keys on it pays off to build a wider table of multiples of G
+WIDE_TABLE_KEYPAIRS = 1000
+# How much ciphertext stream decryption buffers in memory before spilling to
+# a temporary file
+SPOOL_SIZE = 1024 * 1024
+
+
+class _IterableReader:
+    # Lets an iterable of byte chunks be read like a file
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self._buffer = bytearray()
+
+
+    def read(self, size):
+        while len(self._buffer) < size:
+            chunk = next(self._iterator, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        # Deleting from the front of a bytearray doesn't move the rest, so
+        # reading a large chunk piece by piece stays linear
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+def _as_stream(stream):
+    if hasattr(stream, "read"):
+        return stream
+    return _IterableReader(stream)
+
+
+def _read_exactly(stream, length, error):
+    data = b""
+    while len(data) < length:
+        chunk = stream.read(length - len(data))
+        if not chunk:
+            raise ValueError(error)
+        data += chunk
+    return data
+
+
+# The first ECC object created for each backend. Curves are pickled by name
+# and looked up here when unpickled, e.g. in worker processes
+_ecc_instances = {}
+# Called with every newly created curve, e.g. by sslcrypto.instrument
+_new_curve_hooks = []
+
+
+def _load_curve(backend_factory, name):
+    return _ecc_instances[backend_factory].get_curve(name)
 
 
 class ECC:
@@ -277,26 +350,64 @@ class ECC:
     def __init__(self, backend, aes):
         self._backend = backend
         self._aes = aes
+        # Curves are shared by all callers so that precomputed tables and
+        # caches live as long as the process
+        self._curves = {}
+        self._curves_lock = threading.Lock()
+        _ecc_instances.setdefault(backend, self)
 
 
     def get_curve(self, name):
+        try:
+            return self._curves[name]
+        except KeyError:
+            pass
         if name not in self.CURVES:
             raise ValueError("Unknown curve {}".format(name))
-        nid, p, n, a, b, g = self.CURVES[name]
-        params = {"p": p, "n": n, "a": a, "b": b, "g": g}
-        return EllipticCurve(self._backend, params, self._aes, nid)
+        with self._curves_lock:
+            if name not in self._curves:
+                nid, p, n, a, b, g = self.CURVES[name]
+                params = {"p": p, "n": n, "a": a, "b": b, "g": g}
+                curve = EllipticCurve(self._backend, params, self._aes, nid, name)
+                for hook in _new_curve_hooks:
+                    hook(curve)
+                self._curves[name] = curve
+            return self._curves[name]
+
+
+    def hash160_many(self, messages):
+        return hash160_many(messages)
 
 
     def get_backend(self):
         return self._backend.get_backend()
 
 
+class PreparedPublicKey:
+    # A decoded and validated public key that can be used in place of bytes.
+    # The backend may precompute data for faster operations with it
+    def __init__(self, nid, x, y, prepared):
+        self.nid = nid
+        self.x = x
+        self.y = y
+        self._prepared = prepared
+
+
 class EllipticCurve:
-    def __init__(self, backend_factory, params, aes, nid):
+    def __init__(self, backend_factory, params, aes, nid, name=None):
         self._backend = backend_factory(**params)
+        self._backend_factory = backend_factory
         self.params = params
         self._aes = aes
         self.nid = nid
+        self.name = name
+        self._public_key_cache = LRUCache(PUBLIC_KEY_CACHE_SIZE)
+
+
+    def __reduce__(self):
+        if self.name is None or _ecc_instances.get(self._backend_factory) is None:
+            raise TypeError("Only curves returned by ECC.get_curve can be pickled")
+        return _load_curve, (self._backend_factory, self.name)
 
 
     def _encode_public_key(self, x, y, is_compressed=True, raw=True):
@@ -384,25 +495,91 @@ class EllipticCurve:
 
 
     def decode_public_key(self, public_key):
+        if isinstance(public_key, bytes):
+            # Decompressing a point costs a square root, so use the cache
+            return self._load_public_key(public_key)
         return self._decode_public_key(public_key)
 
 
+    def _load_public_key(self, public_key):
+        # Same as _decode_public_key, but remembers keys that are used often
+        if isinstance(public_key, PreparedPublicKey):
+            if public_key.nid != self.nid:
+                raise ValueError("Public key was prepared for another curve")
+            return public_key._prepared
+        if isinstance(public_key, tuple):
+            return public_key
+        if not isinstance(public_key, (bytes, bytearray, memoryview)):
+            # bytes() would turn an int into a zero-filled buffer
+            raise TypeError("Public key must be bytes-like")
+        public_key = bytes(public_key)
+        point = self._public_key_cache.get(public_key)
+        if point is None:
+            point = self._decode_public_key(public_key)
+            self._public_key_cache.put(public_key, point)
+        return point
+
+
+    def prepare_public_key(self, public_key):
+        if isinstance(public_key, PreparedPublicKey):
+            return public_key
+        x, y = self._load_public_key(public_key)
+        return PreparedPublicKey(self.nid, x, y, self._backend.prepare_public_key((x, y)))
+
+
+    def set_public_key_cache_size(self, size):
+        self._public_key_cache.resize(size)
+
+
+    def public_key_cache_info(self):
+        return self._public_key_cache.info()
+
+
     def new_private_key(self, is_compressed=False):
         return self._backend.new_private_key() + (b"\x01" if is_compressed else b"")
 
 
-    def private_to_public(self, private_key):
+    def _split_private_key(self, private_key):
         if len(private_key) == self._backend.public_key_length:
-            is_compressed = False
+            return private_key, False
         elif len(private_key) == self._backend.public_key_length + 1 and private_key[-1] == 1:
-            is_compressed = True
-            private_key = private_key[:-1]
+            return private_key[:-1], True
         else:
             raise ValueError("Private key has invalid length")
+
+
+    def private_to_public(self, private_key):
+        private_key, is_compressed = self._split_private_key(private_key)
         x, y = self._backend.private_to_public(private_key)
         return self._encode_public_key(x, y, is_compressed=is_compressed)
 
 
+    def iterate_public_keys(self, private_key, step=1, count=None):
+        # Yields public keys of private_key, private_key + step, private_key +
+        # 2 * step and so on, count keys in total or indefinitely. This is
+        # much faster than calling private_to_public for each key
+        private_key, is_compressed = self._split_private_key(private_key)
+        batch_size = KEYPAIR_BATCH_SIZE if count is None else min(count, KEYPAIR_BATCH_SIZE)
+        public_keys = self._backend.iterate_public_keys(private_key, step, batch_size)
+        if count is not None:
+            public_keys = itertools.islice(public_keys, count)
+        for x, y in public_keys:
+            yield self._encode_public_key(x, y, is_compressed=is_compressed)
+
+
+    def generate_keypairs(self, count, is_compressed=False):
+        # Yields (private_key, public_key) pairs in the same format as
+        # new_private_key and private_to_public
+        suffix = b"\x01" if is_compressed else b""
+        wide_table = count >= WIDE_TABLE_KEYPAIRS
+        while count > 0:
+            batch = min(count, KEYPAIR_BATCH_SIZE)
+            keypairs = self._backend.generate_keypairs(batch, wide_table=wide_table)
+            for private_key, (x, y) in keypairs:
+                yield private_key + suffix, self._encode_public_key(x, y, is_compressed)
+            count -= batch
+
+
     def private_to_wif(self, private_key):
         return base58.b58encode_check(b"\x80" + private_key)
 
@@ -420,14 +597,32 @@ class EllipticCurve:
         return base58.b58encode_check(b"\x00" + hash160)
 
 
+    def public_to_addresses(self, public_keys):
+        # Same as public_to_address for many keys, hashed in bulk
+        return [base58.b58encode_check(b"\x00" + hash160) for hash160 in hash160_many(public_keys)]
+
+
     def derive(self, private_key, public_key):
         if len(private_key) == self._backend.public_key_length + 1 and private_key[-1] == 1:
             private_key = private_key[:-1]
         if len(private_key) != self._backend.public_key_length:
             raise ValueError("Private key has invalid length")
-        if not isinstance(public_key, tuple):
-            public_key = self._decode_public_key(public_key)
-        return self._backend.ecdh(private_key, public_key)
+        return self._backend.ecdh(private_key, self._load_public_key(public_key))
+
+
+    def multi_scalar_multiply(self, items, is_compressed=False):
+        # sum(k * P) for (P, k) pairs. P is a public key in any format derive
+        # accepts, or None for the generator, and k is an integer, possibly
+        # negative. Returns the encoded point, or None if the sum is the point
+        # at infinity, which is what aggregate checks usually test for
+        items = [
+            (None if public_key is None else self._load_public_key(public_key), scalar)
+            for public_key, scalar in items
+        ]
+        point = self._backend.multi_scalar_multiply(items)
+        if point is None:
+            return None
+        return self._encode_public_key(*point, is_compressed=is_compressed)
 
 
     def _digest(self, data, hash):
@@ -445,24 +640,31 @@ class EllipticCurve:
             raise ValueError("Unknown hash/derivation method")
 
 
+    def _derive_ecies_keys(self, private_key, public_key, algo, derivation):
+        ecdh = self.derive(private_key, public_key)
+        key = self._digest(ecdh, derivation)
+        k_enc_len = self._aes.get_key_length(algo)
+        if len(key) < k_enc_len:
+            raise ValueError("Too short digest")
+        return key[:k_enc_len], key[k_enc_len:]
+
+
+    def _new_ephemeral_key(self):
+        private_key = self.new_private_key()
+        x, y = self._backend.private_to_public(private_key)
+        return private_key, self._encode_public_key(x, y, raw=False)
+
+
     # High-level functions
     def encrypt(self, data, public_key, algo="aes-256-cbc", derivation="sha256", mac="hmac-sha256", return_aes_key=False):
         # Generate ephemeral private key
-        private_key = self.new_private_key()
+        private_key, ephem_public_key = self._new_ephemeral_key()
 
         # Derive key
-        ecdh = self.derive(private_key, public_key)
-        key = self._digest(ecdh, derivation)
-        k_enc_len = self._aes.get_algo_key_length(algo)
-        if len(key) < k_enc_len:
-            raise ValueError("Too short digest")
-        k_enc, k_mac = key[:k_enc_len], key[k_enc_len:]
+        k_enc, k_mac = self._derive_ecies_keys(private_key, public_key, algo, derivation)
 
         # Encrypt
         ciphertext, iv = self._aes.encrypt(data, k_enc, algo=algo)
-        ephem_public_key = self.private_to_public(private_key)
-        ephem_public_key = self._decode_public_key(ephem_public_key)
-        ephem_public_key = self._encode_public_key(*ephem_public_key, raw=False)
         ciphertext = iv + ephem_public_key + ciphertext
 
         # Add MAC tag
@@ -517,12 +719,7 @@ class EllipticCurve:
         ciphertext = ciphertext[pos:]
 
         # Derive key
-        ecdh = self.derive(private_key, public_key)
-        key = self._digest(ecdh, derivation)
-        k_enc_len = self._aes.get_algo_key_length(algo)
-        if len(key) < k_enc_len:
-            raise ValueError("Too short digest")
-        k_enc, k_mac = key[:k_enc_len], key[k_enc_len:]
+        k_enc, k_mac = self._derive_ecies_keys(private_key, public_key, algo, derivation)
 
         # Verify MAC tag
         if callable(mac):
@@ -544,6 +741,95 @@ class EllipticCurve:
         return self._aes.decrypt(ciphertext, iv, k_enc, algo=algo)
 
 
+    def _new_stream_mac(self, k_mac, mac):
+        # Streams need an incremental MAC, so callables are not supported
+        if mac in ("hmac-sha256", "hmac-sha512"):
+            return hmac.new(k_mac, digestmod=mac[5:])
+        elif mac is None:
+            return None
+        else:
+            raise ValueError("Unsupported MAC")
+
+
+    def encrypt_stream(
+        self, in_stream, out_stream, public_key, algo="aes-256-cbc", derivation="sha256",
+        mac="hmac-sha256", chunk_size=CHUNK_SIZE
+    ):
+        # Same format as encrypt(), written to out_stream chunk by chunk.
+        # in_stream is a file-like object or an iterable of bytes
+        in_stream = _as_stream(in_stream)
+        private_key, ephem_public_key = self._new_ephemeral_key()
+        k_enc, k_mac = self._derive_ecies_keys(private_key, public_key, algo, derivation)
+        h = self._new_stream_mac(k_mac, mac)
+        encryptor = self._aes.encryptor(k_enc, algo=algo)
+
+        def write(data):
+            if h is not None:
+                h.update(data)
+            out_stream.write(data)
+
+        write(encryptor.iv + ephem_public_key)
+        while True:
+            chunk = in_stream.read(chunk_size)
+            if not chunk:
+                break
+            write(encryptor.update(chunk))
+        write(encryptor.finalize())
+        if h is not None:
+            out_stream.write(h.digest())
+
+
+    def decrypt_stream(
+        self, in_stream, out_stream, private_key, algo="aes-256-cbc", derivation="sha256",
+        mac="hmac-sha256", chunk_size=CHUNK_SIZE
+    ):
+        # Nothing is written to out_stream until the MAC tag is verified. The
+        # ciphertext is buffered in memory or, if it's large, in a temporary
+        # file meanwhile
+        in_stream = _as_stream(in_stream)
+        iv = _read_exactly(in_stream, 16, "Ciphertext is too small to contain IV")
+        header = _read_exactly(in_stream, 4, "Too short public key")
+        xlen, = struct.unpack("!H", header[2:])
+        header += _read_exactly(in_stream, xlen + 2, "Too short public key")
+        ylen, = struct.unpack("!H", header[-2:])
+        header += _read_exactly(in_stream, ylen, "Too short public key")
+        public_key = self._decode_public_key_openssl(header)
+
+        k_enc, k_mac = self._derive_ecies_keys(private_key, public_key, algo, derivation)
+        h = self._new_stream_mac(k_mac, mac)
+        decryptor = self._aes.decryptor(iv, k_enc, algo=algo)
+
+        if h is None:
+            # Nothing to verify
+            _feed_stream(decryptor, in_stream, out_stream, chunk_size)
+            return
+
+        h.update(iv + header)
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as buffer:
+            # The last bytes of the stream are the tag
+            tail = b""
+            while True:
+                chunk = in_stream.read(chunk_size)
+                if not chunk:
+                    break
+                data = tail + chunk
+                split = len(data) - h.digest_size
+                if split > 0:
+                    h.update(data[:split])
+                    buffer.write(data[:split])
+                    tail = data[split:]
+                else:
+                    tail = data
+
+            if len(tail) < h.digest_size:
+                raise ValueError("Ciphertext is too small to contain MAC tag")
+            if not hmac.compare_digest(tail, h.digest()):
+                raise ValueError("Invalid MAC tag")
+
+            buffer.seek(0)
+            _feed_stream(decryptor, buffer, out_stream, chunk_size)
+
+
     def sign(self, data, private_key, hash="sha256", recoverable=False, entropy=None):
         if len(private_key) == self._backend.public_key_length:
             is_compressed = False
@@ -574,15 +860,137 @@ class EllipticCurve:
         return self._encode_public_key(x, y, is_compressed=is_compressed)
 
 
+    def _prepare_verify(self, signature, data, public_key, hash):
+        length = self._backend.public_key_length
+        if len(signature) not in (2 * length, 1 + 2 * length):
+            raise ValueError("Invalid signature format")
+        return signature, self._digest(data, hash), self._load_public_key(public_key)
+
+
     def verify(self, signature, data, public_key, hash="sha256"):
+        signature, data, public_key = self._prepare_verify(signature, data, public_key, hash)
         if len(signature) == 1 + 2 * self._backend.public_key_length:
             # Recoverable signature
             signature = signature[1:]
-        if len(signature) != 2 * self._backend.public_key_length:
-            raise ValueError("Invalid signature format")
-        if not isinstance(public_key, tuple):
-            public_key = self._decode_public_key(public_key)
-        return self._backend.verify(signature, self._digest(data, hash), public_key)
+        return self._backend.verify(signature, data, public_key)
+
+
+    def verify_batch(self, items, hash="sha256"):
+        # Returns a list of booleans instead of raising on invalid signatures.
+        # A malformed item, e.g. a str instead of bytes or a missing public
+        # key, only gives False for that item. Only recoverable signatures are
+        # verified much faster in bulk than by verify
+        prepared = []
+        for item in items:
+            try:
+                signature, data, public_key = item
+                prepared.append(self._prepare_verify(signature, data, public_key, hash))
+            except (TypeError, ValueError):
+                prepared.append(None)
+        return self._backend.verify_batch(prepared)
+
+
+    def _portable_public_key(self, public_key, remote=True):
+        # Prepared keys hold precomputed tables, which are not worth sending
+        # to other processes. In this process they are kept as is
+        if remote and isinstance(public_key, PreparedPublicKey):
+            if public_key.nid != self.nid:
+                raise ValueError("Public key was prepared for another curve")
+            return public_key.x, public_key.y
+        return public_key
+
+
+    def _portable_verify_item(self, item, remote):
+        try:
+            signature, data, public_key = item
+            return signature, data, self._portable_public_key(public_key, remote)
+        except (TypeError, ValueError):
+            # Left for verify_batch to reject
+            return item
+
+
+    # Bulk functions. They return results in order. With workers=N > 1, work
+    # is spread over a pool of N processes, which is reused by later calls
+    # until sslcrypto.shutdown_workers(); by default everything runs in the
+    # calling process
+    def sign_many(self, items, workers=None, hash="sha256", recoverable=False):
+        # items are (data, private_key) pairs
+        options = {"hash": hash, "recoverable": recoverable}
+        return _pool.map_curve(self, "sign", items, options, workers)
+
+
+    def verify_many(self, items, workers=None, hash="sha256"):
+        # items are (signature, data, public_key) triples. Returns booleans
+        # like verify_batch, which also rejects malformed items
+        remote = _pool.uses_processes(workers)
+        items = [self._portable_verify_item(item, remote) for item in items]
+        return _pool.map_curve(self, "verify_batch", items, {"hash": hash}, workers)
+
+
+    def derive_many(self, items, workers=None):
+        # items are (private_key, public_key) pairs
+        remote = _pool.uses_processes(workers)
+        items = [(priv, self._portable_public_key(pub, remote)) for priv, pub in items]
+        return _pool.map_curve(self, "derive", items, {}, workers)
+
+
+    def encrypt_many(
+        self, items, workers=None, algo="aes-256-cbc", derivation="sha256", mac="hmac-sha256"
+    ):
+        # items are (data, public_key) pairs
+        remote = _pool.uses_processes(workers)
+        items = [(data, self._portable_public_key(pub, remote)) for data, pub in items]
+        options = {"algo": algo, "derivation": derivation, "mac": mac}
+        return _pool.map_curve(self, "encrypt", items, options, workers)
+
+
+    def decrypt_many(
+        self, items, workers=None, algo="aes-256-cbc", derivation="sha256", mac="hmac-sha256"
+    ):
+        # items are (ciphertext, private_key) pairs
+        options = {"algo": algo, "derivation": derivation, "mac": mac}
+        return _pool.map_curve(self, "decrypt", items, options, workers)
+
+
+    # Coroutine versions of the functions above. They run in the executor set
+    # by sslcrypto.configure_async, and concurrent averify calls are checked
+    # with verify_batch
+    async def asign(self, data, private_key, hash="sha256", recoverable=False, entropy=None):
+        return await _async.run(
+            self.sign, data, private_key, hash=hash, recoverable=recoverable, entropy=entropy
+        )
+
+
+    async def averify(self, signature, data, public_key, hash="sha256"):
+        return await _async.verify(self, signature, data, public_key, hash)
+
+
+    async def arecover(self, signature, data, hash="sha256"):
+        return await _async.run(self.recover, signature, data, hash=hash)
+
+
+    async def aderive(self, private_key, public_key):
+        public_key = self._portable_public_key(public_key, _async.uses_processes())
+        return await _async.run(self.derive, private_key, public_key)
+
+
+    async def aencrypt(
+        self, data, public_key, algo="aes-256-cbc", derivation="sha256", mac="hmac-sha256",
+        return_aes_key=False
+    ):
+        public_key = self._portable_public_key(public_key, _async.uses_processes())
+        return await _async.run(
+            self.encrypt, data, public_key,
+            algo=algo, derivation=derivation, mac=mac, return_aes_key=return_aes_key
+        )
+
+
+    async def adecrypt(
+        self, ciphertext, private_key, algo="aes-256-cbc", derivation="sha256", mac="hmac-sha256"
+    ):
+        return await _async.run(
+            self.decrypt, ciphertext, private_key, algo=algo, derivation=derivation, mac=mac
+        )
 
 
     def derive_child(self, seed, child):
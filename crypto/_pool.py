@@ -0,0 +1,66 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+__all__ = ["map_curve", "uses_processes", "shutdown"]
+
+
+# Each worker gets a few chunks so that slow chunks don't stall the pool, but
+# chunks are large enough for pickling not to dominate
+CHUNKS_PER_WORKER = 4
+MAX_CHUNK_SIZE = 256
+
+
+# Pools are kept alive between calls so that curves, their precomputed tables
+# and caches stay warm in the workers. shutdown() stops them
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(workers):
+    with _executors_lock:
+        if workers not in _executors:
+            _executors[workers] = ProcessPoolExecutor(max_workers=workers)
+        return _executors[workers]
+
+
+def shutdown():
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown()
+
+
+def uses_processes(workers):
+    return workers is not None and workers > 1
+
+
+def _run_chunk(curve, method, chunk, kwargs):
+    # Runs in a worker. curve is unpickled via ECC.get_curve, so it's the
+    # worker's interned instance
+    func = getattr(curve, method)
+    if method == "verify_batch":
+        return func(chunk, **kwargs)
+    return [func(*item, **kwargs) for item in chunk]
+
+
+def map_curve(curve, method, items, kwargs, workers=None):
+    # Calls curve.method(*item, **kwargs) for each item, or verify_batch on
+    # chunks of items, and returns results in order. Work is done in the
+    # calling process unless more than one worker is requested explicitly
+    items = list(items)
+    if not uses_processes(workers) or len(items) <= 1:
+        return _run_chunk(curve, method, items, kwargs)
+
+    chunk_size = -(-len(items) // (workers * CHUNKS_PER_WORKER))
+    chunk_size = max(1, min(chunk_size, MAX_CHUNK_SIZE))
+    executor = _get_executor(workers)
+    futures = [
+        executor.submit(_run_chunk, curve, method, items[i:i + chunk_size], kwargs)
+        for i in range(0, len(items), chunk_size)
+    ]
+    results = []
+    for future in futures:
+        results += future.result()
+    return results
@@ -22,47 +22,54 @@
 
 # pylint: skip-file
 
-import sys
+import struct
 
 digest_size = 20
 digestsize = 20
 
+
 class RIPEMD160:
     """
     Return a new RIPEMD160 object. An optional string argument
     may be provided; if present, this string will be automatically
     hashed.
     """
-    
+
     def __init__(self, arg=None):
-        self.ctx = RMDContext()
+        self._state = IV
+        self._buffer = b""
+        self._count = 0
         if arg:
             self.update(arg)
-        self.dig = None
-        
+
     def update(self, arg):
-        RMD160Update(self.ctx, arg, len(arg))
-        self.dig = None
-        
+        if isinstance(arg, str):
+            arg = bytes(ord(c) & 0xff for c in arg)
+        data = self._buffer + bytes(arg)
+        self._count += len(arg)
+        end = len(data) - len(data) % 64
+        state = self._state
+        for off in range(0, end, 64):
+            state = _compress(state, _unpack_block(data, off), 0xFFFFFFFF, K)
+        self._state = state
+        self._buffer = data[end:]
+
     def digest(self):
-        if self.dig:
-            return self.dig
-        ctx = self.ctx.copy()
-        self.dig = RMD160Final(self.ctx)
-        self.ctx = ctx
-        return self.dig
-    
+        state = self._state
+        tail = _pad(self._buffer, self._count)
+        for off in range(0, len(tail), 64):
+            state = _compress(state, _unpack_block(tail, off), 0xFFFFFFFF, K)
+        return struct.pack("<5L", *state)
+
     def hexdigest(self):
-        dig = self.digest()
-        hex_digest = ""
-        for d in dig:
-            hex_digest += "%02x" % d
-        return hex_digest
-    
-    def copy(self):
-        import copy
-        return copy.deepcopy(self)
+        return self.digest().hex()
 
+    def copy(self):
+        other = RIPEMD160()
+        other._state = self._state
+        other._buffer = self._buffer
+        other._count = self._count
+        return other
 
 
 def new(arg=None):
@@ -74,23 +81,37 @@ def new(arg=None):
     return RIPEMD160(arg)
 
 
+# How many messages ripemd160_many hashes at once
+LANES = 256
+
+
+def ripemd160_many(messages):
+    """
+    Return RIPEMD160 digests of all messages. Messages with the same number
+    of blocks are hashed together: word i of every message is packed into a
+    64-bit lane of one big integer, so each arithmetic operation processes
+    all of them at once.
+    """
+    messages = [bytes(message) for message in messages]
+    digests = [None] * len(messages)
+    groups = {}
+    for i, message in enumerate(messages):
+        # Number of blocks after padding
+        groups.setdefault((len(message) + 8) // 64, []).append(i)
+    for indices in groups.values():
+        for start in range(0, len(indices), LANES):
+            chunk = indices[start:start + LANES]
+            padded = [_pad(messages[i], len(messages[i])) for i in chunk]
+            for i, digest in zip(chunk, _hash_lanes(padded)):
+                digests[i] = digest
+    return digests
+
 
 #
 # Private.
 #
 
-class RMDContext:
-    def __init__(self):
-        self.state = [0x67452301, 0xEFCDAB89, 0x98BADCFE,
-                      0x10325476, 0xC3D2E1F0] # uint32
-        self.count = 0 # uint64
-        self.buffer = [0] * 64 # uchar
-    def copy(self):
-        ctx = RMDContext()
-        ctx.state = self.state[:]
-        ctx.count = self.count
-        ctx.buffer = self.buffer[:]
-        return ctx
+IV = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0)
 
 K0 = 0x00000000
 K1 = 0x5A827999
@@ -104,270 +125,550 @@ KK2 = 0x6D703EF3
 KK3 = 0x7A6D76E9
 KK4 = 0x00000000
 
-def ROL(n, x):
-    return ((x << n) & 0xffffffff) | (x >> (32 - n))
+# The non-zero constants, in the order _compress expects them
+K = (K1, K2, K3, K4, KK0, KK1, KK2, KK3)
 
-def F0(x, y, z):
-    return x ^ y ^ z
+# struct works the same way on little- and big-endian platforms
+_block = struct.Struct("<16L")
 
-def F1(x, y, z):
-    return (x & y) | (((~x) % 0x100000000) & z)
 
-def F2(x, y, z):
-    return (x | ((~y) % 0x100000000)) ^ z
+def _unpack_block(data, off):
+    return _block.unpack_from(data, off)
 
-def F3(x, y, z):
-    return (x & z) | (((~z) % 0x100000000) & y)
 
-def F4(x, y, z):
-    return x ^ (y | ((~z) % 0x100000000))
+def _pad(data, length):
+    # Padding for a message of the given length, appended to its last
+    # incomplete block
+    return data + b"\x80" + b"\x00" * ((55 - length) % 64) + struct.pack("<Q", 8 * length)
 
-def R(a, b, c, d, e, Fj, Kj, sj, rj, X):
-    a = ROL(sj, (a + Fj(b, c, d) + X[rj] + Kj) % 0x100000000) + e
-    c = ROL(10, c)
-    return a % 0x100000000, c
 
-PADDING = [0x80] + [0] * 63
+def _hash_lanes(padded):
+    # All messages must have the same length after padding
+    n = len(padded)
+    ones = int.from_bytes(b"\x01\x00\x00\x00\x00\x00\x00\x00" * n, "little")
+    m = 0xFFFFFFFF * ones
+    k = tuple(c * ones for c in K)
+    state = tuple(h * ones for h in IV)
+    zero = b"\x00\x00\x00\x00"
+    for off in range(0, len(padded[0]), 64):
+        x = [
+            int.from_bytes(b"".join(block[off + 4 * i:off + 4 * i + 4] + zero for block in padded), "little")
+            for i in range(16)
+        ]
+        state = _compress(state, x, m, k)
+    state = [h.to_bytes(8 * n, "little") for h in state]
+    return [b"".join(h[8 * i:8 * i + 4] for h in state) for i in range(n)]
 
-import sys
-import struct
 
-def RMD160Transform(state, block): # uint32 state[5], uchar block[64]
-    x = [0] * 16
-    if sys.byteorder == "little":
-        x = struct.unpack("<16L", bytes(block[0:64]))
-    else:
-        raise ValueError("Big-endian platforms are not supported")
-    a = state[0]
-    b = state[1]
-    c = state[2]
-    d = state[3]
-    e = state[4]
+def _compress(state, x, m, k):
+    # One block, rounds unrolled. m is the 32-bit mask (possibly repeated in
+    # several lanes), the boolean functions use "^ m" instead of "~" to stay
+    # within it
+    h0, h1, h2, h3, h4 = state
+    x0, x1, x2, x3, x4, x5, x6, x7, x8, x9, x10, x11, x12, x13, x14, x15 = x
+    k1, k2, k3, k4, kk0, kk1, kk2, kk3 = k
 
+    a, b, c, d, e = h0, h1, h2, h3, h4
     # Round 1
-    a, c = R(a, b, c, d, e, F0, K0, 11,  0, x)
-    e, b = R(e, a, b, c, d, F0, K0, 14,  1, x)
-    d, a = R(d, e, a, b, c, F0, K0, 15,  2, x)
-    c, e = R(c, d, e, a, b, F0, K0, 12,  3, x)
-    b, d = R(b, c, d, e, a, F0, K0,  5,  4, x)
-    a, c = R(a, b, c, d, e, F0, K0,  8,  5, x)
-    e, b = R(e, a, b, c, d, F0, K0,  7,  6, x)
-    d, a = R(d, e, a, b, c, F0, K0,  9,  7, x)
-    c, e = R(c, d, e, a, b, F0, K0, 11,  8, x)
-    b, d = R(b, c, d, e, a, F0, K0, 13,  9, x)
-    a, c = R(a, b, c, d, e, F0, K0, 14, 10, x)
-    e, b = R(e, a, b, c, d, F0, K0, 15, 11, x)
-    d, a = R(d, e, a, b, c, F0, K0,  6, 12, x)
-    c, e = R(c, d, e, a, b, F0, K0,  7, 13, x)
-    b, d = R(b, c, d, e, a, F0, K0,  9, 14, x)
-    a, c = R(a, b, c, d, e, F0, K0,  8, 15, x) # #15
+    t = (a + (b ^ c ^ d) + x0) & m
+    a = ((((t << 11) | (t >> 21)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (a ^ b ^ c) + x1) & m
+    e = ((((t << 14) | (t >> 18)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (e ^ a ^ b) + x2) & m
+    d = ((((t << 15) | (t >> 17)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (d ^ e ^ a) + x3) & m
+    c = ((((t << 12) | (t >> 20)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (c ^ d ^ e) + x4) & m
+    b = ((((t << 5) | (t >> 27)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (b ^ c ^ d) + x5) & m
+    a = ((((t << 8) | (t >> 24)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (a ^ b ^ c) + x6) & m
+    e = ((((t << 7) | (t >> 25)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (e ^ a ^ b) + x7) & m
+    d = ((((t << 9) | (t >> 23)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (d ^ e ^ a) + x8) & m
+    c = ((((t << 11) | (t >> 21)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (c ^ d ^ e) + x9) & m
+    b = ((((t << 13) | (t >> 19)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (b ^ c ^ d) + x10) & m
+    a = ((((t << 14) | (t >> 18)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (a ^ b ^ c) + x11) & m
+    e = ((((t << 15) | (t >> 17)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (e ^ a ^ b) + x12) & m
+    d = ((((t << 6) | (t >> 26)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (d ^ e ^ a) + x13) & m
+    c = ((((t << 7) | (t >> 25)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (c ^ d ^ e) + x14) & m
+    b = ((((t << 9) | (t >> 23)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (b ^ c ^ d) + x15) & m
+    a = ((((t << 8) | (t >> 24)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
     # Round 2
-    e, b = R(e, a, b, c, d, F1, K1,  7,  7, x)
-    d, a = R(d, e, a, b, c, F1, K1,  6,  4, x)
-    c, e = R(c, d, e, a, b, F1, K1,  8, 13, x)
-    b, d = R(b, c, d, e, a, F1, K1, 13,  1, x)
-    a, c = R(a, b, c, d, e, F1, K1, 11, 10, x)
-    e, b = R(e, a, b, c, d, F1, K1,  9,  6, x)
-    d, a = R(d, e, a, b, c, F1, K1,  7, 15, x)
-    c, e = R(c, d, e, a, b, F1, K1, 15,  3, x)
-    b, d = R(b, c, d, e, a, F1, K1,  7, 12, x)
-    a, c = R(a, b, c, d, e, F1, K1, 12,  0, x)
-    e, b = R(e, a, b, c, d, F1, K1, 15,  9, x)
-    d, a = R(d, e, a, b, c, F1, K1,  9,  5, x)
-    c, e = R(c, d, e, a, b, F1, K1, 11,  2, x)
-    b, d = R(b, c, d, e, a, F1, K1,  7, 14, x)
-    a, c = R(a, b, c, d, e, F1, K1, 13, 11, x)
-    e, b = R(e, a, b, c, d, F1, K1, 12,  8, x) # #31
+    t = (e + (c ^ (a & (b ^ c))) + x7 + k1) & m
+    e = ((((t << 7) | (t >> 25)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (b ^ (e & (a ^ b))) + x4 + k1) & m
+    d = ((((t << 6) | (t >> 26)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (a ^ (d & (e ^ a))) + x13 + k1) & m
+    c = ((((t << 8) | (t >> 24)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (e ^ (c & (d ^ e))) + x1 + k1) & m
+    b = ((((t << 13) | (t >> 19)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (d ^ (b & (c ^ d))) + x10 + k1) & m
+    a = ((((t << 11) | (t >> 21)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (c ^ (a & (b ^ c))) + x6 + k1) & m
+    e = ((((t << 9) | (t >> 23)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (b ^ (e & (a ^ b))) + x15 + k1) & m
+    d = ((((t << 7) | (t >> 25)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (a ^ (d & (e ^ a))) + x3 + k1) & m
+    c = ((((t << 15) | (t >> 17)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (e ^ (c & (d ^ e))) + x12 + k1) & m
+    b = ((((t << 7) | (t >> 25)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (d ^ (b & (c ^ d))) + x0 + k1) & m
+    a = ((((t << 12) | (t >> 20)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (c ^ (a & (b ^ c))) + x9 + k1) & m
+    e = ((((t << 15) | (t >> 17)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (b ^ (e & (a ^ b))) + x5 + k1) & m
+    d = ((((t << 9) | (t >> 23)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (a ^ (d & (e ^ a))) + x2 + k1) & m
+    c = ((((t << 11) | (t >> 21)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (e ^ (c & (d ^ e))) + x14 + k1) & m
+    b = ((((t << 7) | (t >> 25)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (d ^ (b & (c ^ d))) + x11 + k1) & m
+    a = ((((t << 13) | (t >> 19)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (c ^ (a & (b ^ c))) + x8 + k1) & m
+    e = ((((t << 12) | (t >> 20)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
     # Round 3
-    d, a = R(d, e, a, b, c, F2, K2, 11,  3, x)
-    c, e = R(c, d, e, a, b, F2, K2, 13, 10, x)
-    b, d = R(b, c, d, e, a, F2, K2,  6, 14, x)
-    a, c = R(a, b, c, d, e, F2, K2,  7,  4, x)
-    e, b = R(e, a, b, c, d, F2, K2, 14,  9, x)
-    d, a = R(d, e, a, b, c, F2, K2,  9, 15, x)
-    c, e = R(c, d, e, a, b, F2, K2, 13,  8, x)
-    b, d = R(b, c, d, e, a, F2, K2, 15,  1, x)
-    a, c = R(a, b, c, d, e, F2, K2, 14,  2, x)
-    e, b = R(e, a, b, c, d, F2, K2,  8,  7, x)
-    d, a = R(d, e, a, b, c, F2, K2, 13,  0, x)
-    c, e = R(c, d, e, a, b, F2, K2,  6,  6, x)
-    b, d = R(b, c, d, e, a, F2, K2,  5, 13, x)
-    a, c = R(a, b, c, d, e, F2, K2, 12, 11, x)
-    e, b = R(e, a, b, c, d, F2, K2,  7,  5, x)
-    d, a = R(d, e, a, b, c, F2, K2,  5, 12, x) # #47
+    t = (d + ((e | (a ^ m)) ^ b) + x3 + k2) & m
+    d = ((((t << 11) | (t >> 21)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + ((d | (e ^ m)) ^ a) + x10 + k2) & m
+    c = ((((t << 13) | (t >> 19)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + ((c | (d ^ m)) ^ e) + x14 + k2) & m
+    b = ((((t << 6) | (t >> 26)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + ((b | (c ^ m)) ^ d) + x4 + k2) & m
+    a = ((((t << 7) | (t >> 25)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + ((a | (b ^ m)) ^ c) + x9 + k2) & m
+    e = ((((t << 14) | (t >> 18)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + ((e | (a ^ m)) ^ b) + x15 + k2) & m
+    d = ((((t << 9) | (t >> 23)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + ((d | (e ^ m)) ^ a) + x8 + k2) & m
+    c = ((((t << 13) | (t >> 19)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + ((c | (d ^ m)) ^ e) + x1 + k2) & m
+    b = ((((t << 15) | (t >> 17)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + ((b | (c ^ m)) ^ d) + x2 + k2) & m
+    a = ((((t << 14) | (t >> 18)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + ((a | (b ^ m)) ^ c) + x7 + k2) & m
+    e = ((((t << 8) | (t >> 24)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + ((e | (a ^ m)) ^ b) + x0 + k2) & m
+    d = ((((t << 13) | (t >> 19)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + ((d | (e ^ m)) ^ a) + x6 + k2) & m
+    c = ((((t << 6) | (t >> 26)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + ((c | (d ^ m)) ^ e) + x13 + k2) & m
+    b = ((((t << 5) | (t >> 27)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + ((b | (c ^ m)) ^ d) + x11 + k2) & m
+    a = ((((t << 12) | (t >> 20)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + ((a | (b ^ m)) ^ c) + x5 + k2) & m
+    e = ((((t << 7) | (t >> 25)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + ((e | (a ^ m)) ^ b) + x12 + k2) & m
+    d = ((((t << 5) | (t >> 27)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
     # Round 4
-    c, e = R(c, d, e, a, b, F3, K3, 11,  1, x)
-    b, d = R(b, c, d, e, a, F3, K3, 12,  9, x)
-    a, c = R(a, b, c, d, e, F3, K3, 14, 11, x)
-    e, b = R(e, a, b, c, d, F3, K3, 15, 10, x)
-    d, a = R(d, e, a, b, c, F3, K3, 14,  0, x)
-    c, e = R(c, d, e, a, b, F3, K3, 15,  8, x)
-    b, d = R(b, c, d, e, a, F3, K3,  9, 12, x)
-    a, c = R(a, b, c, d, e, F3, K3,  8,  4, x)
-    e, b = R(e, a, b, c, d, F3, K3,  9, 13, x)
-    d, a = R(d, e, a, b, c, F3, K3, 14,  3, x)
-    c, e = R(c, d, e, a, b, F3, K3,  5,  7, x)
-    b, d = R(b, c, d, e, a, F3, K3,  6, 15, x)
-    a, c = R(a, b, c, d, e, F3, K3,  8, 14, x)
-    e, b = R(e, a, b, c, d, F3, K3,  6,  5, x)
-    d, a = R(d, e, a, b, c, F3, K3,  5,  6, x)
-    c, e = R(c, d, e, a, b, F3, K3, 12,  2, x) # #63
+    t = (c + (e ^ (a & (d ^ e))) + x1 + k3) & m
+    c = ((((t << 11) | (t >> 21)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (d ^ (e & (c ^ d))) + x9 + k3) & m
+    b = ((((t << 12) | (t >> 20)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (c ^ (d & (b ^ c))) + x11 + k3) & m
+    a = ((((t << 14) | (t >> 18)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (b ^ (c & (a ^ b))) + x10 + k3) & m
+    e = ((((t << 15) | (t >> 17)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (a ^ (b & (e ^ a))) + x0 + k3) & m
+    d = ((((t << 14) | (t >> 18)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (e ^ (a & (d ^ e))) + x8 + k3) & m
+    c = ((((t << 15) | (t >> 17)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (d ^ (e & (c ^ d))) + x12 + k3) & m
+    b = ((((t << 9) | (t >> 23)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (c ^ (d & (b ^ c))) + x4 + k3) & m
+    a = ((((t << 8) | (t >> 24)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (b ^ (c & (a ^ b))) + x13 + k3) & m
+    e = ((((t << 9) | (t >> 23)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (a ^ (b & (e ^ a))) + x3 + k3) & m
+    d = ((((t << 14) | (t >> 18)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (e ^ (a & (d ^ e))) + x7 + k3) & m
+    c = ((((t << 5) | (t >> 27)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (d ^ (e & (c ^ d))) + x15 + k3) & m
+    b = ((((t << 6) | (t >> 26)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (c ^ (d & (b ^ c))) + x14 + k3) & m
+    a = ((((t << 8) | (t >> 24)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (b ^ (c & (a ^ b))) + x5 + k3) & m
+    e = ((((t << 6) | (t >> 26)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (a ^ (b & (e ^ a))) + x6 + k3) & m
+    d = ((((t << 5) | (t >> 27)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (e ^ (a & (d ^ e))) + x2 + k3) & m
+    c = ((((t << 12) | (t >> 20)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
     # Round 5
-    b, d = R(b, c, d, e, a, F4, K4,  9,  4, x)
-    a, c = R(a, b, c, d, e, F4, K4, 15,  0, x)
-    e, b = R(e, a, b, c, d, F4, K4,  5,  5, x)
-    d, a = R(d, e, a, b, c, F4, K4, 11,  9, x)
-    c, e = R(c, d, e, a, b, F4, K4,  6,  7, x)
-    b, d = R(b, c, d, e, a, F4, K4,  8, 12, x)
-    a, c = R(a, b, c, d, e, F4, K4, 13,  2, x)
-    e, b = R(e, a, b, c, d, F4, K4, 12, 10, x)
-    d, a = R(d, e, a, b, c, F4, K4,  5, 14, x)
-    c, e = R(c, d, e, a, b, F4, K4, 12,  1, x)
-    b, d = R(b, c, d, e, a, F4, K4, 13,  3, x)
-    a, c = R(a, b, c, d, e, F4, K4, 14,  8, x)
-    e, b = R(e, a, b, c, d, F4, K4, 11, 11, x)
-    d, a = R(d, e, a, b, c, F4, K4,  8,  6, x)
-    c, e = R(c, d, e, a, b, F4, K4,  5, 15, x)
-    b, d = R(b, c, d, e, a, F4, K4,  6, 13, x) # #79
-
-    aa = a
-    bb = b
-    cc = c
-    dd = d
-    ee = e
-
-    a = state[0]
-    b = state[1]
-    c = state[2]
-    d = state[3]
-    e = state[4]    
-
+    t = (b + (c ^ (d | (e ^ m))) + x4 + k4) & m
+    b = ((((t << 9) | (t >> 23)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (b ^ (c | (d ^ m))) + x0 + k4) & m
+    a = ((((t << 15) | (t >> 17)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (a ^ (b | (c ^ m))) + x5 + k4) & m
+    e = ((((t << 5) | (t >> 27)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (e ^ (a | (b ^ m))) + x9 + k4) & m
+    d = ((((t << 11) | (t >> 21)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (d ^ (e | (a ^ m))) + x7 + k4) & m
+    c = ((((t << 6) | (t >> 26)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (c ^ (d | (e ^ m))) + x12 + k4) & m
+    b = ((((t << 8) | (t >> 24)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (b ^ (c | (d ^ m))) + x2 + k4) & m
+    a = ((((t << 13) | (t >> 19)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (a ^ (b | (c ^ m))) + x10 + k4) & m
+    e = ((((t << 12) | (t >> 20)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (e ^ (a | (b ^ m))) + x14 + k4) & m
+    d = ((((t << 5) | (t >> 27)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (d ^ (e | (a ^ m))) + x1 + k4) & m
+    c = ((((t << 12) | (t >> 20)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (c ^ (d | (e ^ m))) + x3 + k4) & m
+    b = ((((t << 13) | (t >> 19)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (b ^ (c | (d ^ m))) + x8 + k4) & m
+    a = ((((t << 14) | (t >> 18)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (a ^ (b | (c ^ m))) + x11 + k4) & m
+    e = ((((t << 11) | (t >> 21)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (e ^ (a | (b ^ m))) + x6 + k4) & m
+    d = ((((t << 8) | (t >> 24)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (d ^ (e | (a ^ m))) + x15 + k4) & m
+    c = ((((t << 5) | (t >> 27)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (c ^ (d | (e ^ m))) + x13 + k4) & m
+    b = ((((t << 6) | (t >> 26)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    aa, bb, cc, dd, ee = a, b, c, d, e
+    a, b, c, d, e = h0, h1, h2, h3, h4
     # Parallel round 1
-    a, c = R(a, b, c, d, e, F4, KK0,  8,  5, x)
-    e, b = R(e, a, b, c, d, F4, KK0,  9, 14, x)
-    d, a = R(d, e, a, b, c, F4, KK0,  9,  7, x)
-    c, e = R(c, d, e, a, b, F4, KK0, 11,  0, x)
-    b, d = R(b, c, d, e, a, F4, KK0, 13,  9, x)
-    a, c = R(a, b, c, d, e, F4, KK0, 15,  2, x)
-    e, b = R(e, a, b, c, d, F4, KK0, 15, 11, x)
-    d, a = R(d, e, a, b, c, F4, KK0,  5,  4, x)
-    c, e = R(c, d, e, a, b, F4, KK0,  7, 13, x)
-    b, d = R(b, c, d, e, a, F4, KK0,  7,  6, x)
-    a, c = R(a, b, c, d, e, F4, KK0,  8, 15, x)
-    e, b = R(e, a, b, c, d, F4, KK0, 11,  8, x)
-    d, a = R(d, e, a, b, c, F4, KK0, 14,  1, x)
-    c, e = R(c, d, e, a, b, F4, KK0, 14, 10, x)
-    b, d = R(b, c, d, e, a, F4, KK0, 12,  3, x)
-    a, c = R(a, b, c, d, e, F4, KK0,  6, 12, x) # #15
+    t = (a + (b ^ (c | (d ^ m))) + x5 + kk0) & m
+    a = ((((t << 8) | (t >> 24)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (a ^ (b | (c ^ m))) + x14 + kk0) & m
+    e = ((((t << 9) | (t >> 23)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (e ^ (a | (b ^ m))) + x7 + kk0) & m
+    d = ((((t << 9) | (t >> 23)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (d ^ (e | (a ^ m))) + x0 + kk0) & m
+    c = ((((t << 11) | (t >> 21)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (c ^ (d | (e ^ m))) + x9 + kk0) & m
+    b = ((((t << 13) | (t >> 19)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (b ^ (c | (d ^ m))) + x2 + kk0) & m
+    a = ((((t << 15) | (t >> 17)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (a ^ (b | (c ^ m))) + x11 + kk0) & m
+    e = ((((t << 15) | (t >> 17)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (e ^ (a | (b ^ m))) + x4 + kk0) & m
+    d = ((((t << 5) | (t >> 27)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (d ^ (e | (a ^ m))) + x13 + kk0) & m
+    c = ((((t << 7) | (t >> 25)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (c ^ (d | (e ^ m))) + x6 + kk0) & m
+    b = ((((t << 7) | (t >> 25)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (b ^ (c | (d ^ m))) + x15 + kk0) & m
+    a = ((((t << 8) | (t >> 24)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (a ^ (b | (c ^ m))) + x8 + kk0) & m
+    e = ((((t << 11) | (t >> 21)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (e ^ (a | (b ^ m))) + x1 + kk0) & m
+    d = ((((t << 14) | (t >> 18)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (d ^ (e | (a ^ m))) + x10 + kk0) & m
+    c = ((((t << 14) | (t >> 18)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (c ^ (d | (e ^ m))) + x3 + kk0) & m
+    b = ((((t << 12) | (t >> 20)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (b ^ (c | (d ^ m))) + x12 + kk0) & m
+    a = ((((t << 6) | (t >> 26)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
     # Parallel round 2
-    e, b = R(e, a, b, c, d, F3, KK1,  9,  6, x)
-    d, a = R(d, e, a, b, c, F3, KK1, 13, 11, x)
-    c, e = R(c, d, e, a, b, F3, KK1, 15,  3, x)
-    b, d = R(b, c, d, e, a, F3, KK1,  7,  7, x)
-    a, c = R(a, b, c, d, e, F3, KK1, 12,  0, x)
-    e, b = R(e, a, b, c, d, F3, KK1,  8, 13, x)
-    d, a = R(d, e, a, b, c, F3, KK1,  9,  5, x)
-    c, e = R(c, d, e, a, b, F3, KK1, 11, 10, x)
-    b, d = R(b, c, d, e, a, F3, KK1,  7, 14, x)
-    a, c = R(a, b, c, d, e, F3, KK1,  7, 15, x)
-    e, b = R(e, a, b, c, d, F3, KK1, 12,  8, x)
-    d, a = R(d, e, a, b, c, F3, KK1,  7, 12, x)
-    c, e = R(c, d, e, a, b, F3, KK1,  6,  4, x)
-    b, d = R(b, c, d, e, a, F3, KK1, 15,  9, x)
-    a, c = R(a, b, c, d, e, F3, KK1, 13,  1, x)
-    e, b = R(e, a, b, c, d, F3, KK1, 11,  2, x) # #31
+    t = (e + (b ^ (c & (a ^ b))) + x6 + kk1) & m
+    e = ((((t << 9) | (t >> 23)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (a ^ (b & (e ^ a))) + x11 + kk1) & m
+    d = ((((t << 13) | (t >> 19)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (e ^ (a & (d ^ e))) + x3 + kk1) & m
+    c = ((((t << 15) | (t >> 17)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (d ^ (e & (c ^ d))) + x7 + kk1) & m
+    b = ((((t << 7) | (t >> 25)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (c ^ (d & (b ^ c))) + x0 + kk1) & m
+    a = ((((t << 12) | (t >> 20)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (b ^ (c & (a ^ b))) + x13 + kk1) & m
+    e = ((((t << 8) | (t >> 24)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (a ^ (b & (e ^ a))) + x5 + kk1) & m
+    d = ((((t << 9) | (t >> 23)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (e ^ (a & (d ^ e))) + x10 + kk1) & m
+    c = ((((t << 11) | (t >> 21)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (d ^ (e & (c ^ d))) + x14 + kk1) & m
+    b = ((((t << 7) | (t >> 25)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (c ^ (d & (b ^ c))) + x15 + kk1) & m
+    a = ((((t << 7) | (t >> 25)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (b ^ (c & (a ^ b))) + x8 + kk1) & m
+    e = ((((t << 12) | (t >> 20)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (a ^ (b & (e ^ a))) + x12 + kk1) & m
+    d = ((((t << 7) | (t >> 25)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (e ^ (a & (d ^ e))) + x4 + kk1) & m
+    c = ((((t << 6) | (t >> 26)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (d ^ (e & (c ^ d))) + x9 + kk1) & m
+    b = ((((t << 15) | (t >> 17)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (c ^ (d & (b ^ c))) + x1 + kk1) & m
+    a = ((((t << 13) | (t >> 19)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (b ^ (c & (a ^ b))) + x2 + kk1) & m
+    e = ((((t << 11) | (t >> 21)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
     # Parallel round 3
-    d, a = R(d, e, a, b, c, F2, KK2,  9, 15, x)
-    c, e = R(c, d, e, a, b, F2, KK2,  7,  5, x)
-    b, d = R(b, c, d, e, a, F2, KK2, 15,  1, x)
-    a, c = R(a, b, c, d, e, F2, KK2, 11,  3, x)
-    e, b = R(e, a, b, c, d, F2, KK2,  8,  7, x)
-    d, a = R(d, e, a, b, c, F2, KK2,  6, 14, x)
-    c, e = R(c, d, e, a, b, F2, KK2,  6,  6, x)
-    b, d = R(b, c, d, e, a, F2, KK2, 14,  9, x)
-    a, c = R(a, b, c, d, e, F2, KK2, 12, 11, x)
-    e, b = R(e, a, b, c, d, F2, KK2, 13,  8, x)
-    d, a = R(d, e, a, b, c, F2, KK2,  5, 12, x)
-    c, e = R(c, d, e, a, b, F2, KK2, 14,  2, x)
-    b, d = R(b, c, d, e, a, F2, KK2, 13, 10, x)
-    a, c = R(a, b, c, d, e, F2, KK2, 13,  0, x)
-    e, b = R(e, a, b, c, d, F2, KK2,  7,  4, x)
-    d, a = R(d, e, a, b, c, F2, KK2,  5, 13, x) # #47
+    t = (d + ((e | (a ^ m)) ^ b) + x15 + kk2) & m
+    d = ((((t << 9) | (t >> 23)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + ((d | (e ^ m)) ^ a) + x5 + kk2) & m
+    c = ((((t << 7) | (t >> 25)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + ((c | (d ^ m)) ^ e) + x1 + kk2) & m
+    b = ((((t << 15) | (t >> 17)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + ((b | (c ^ m)) ^ d) + x3 + kk2) & m
+    a = ((((t << 11) | (t >> 21)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + ((a | (b ^ m)) ^ c) + x7 + kk2) & m
+    e = ((((t << 8) | (t >> 24)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + ((e | (a ^ m)) ^ b) + x14 + kk2) & m
+    d = ((((t << 6) | (t >> 26)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + ((d | (e ^ m)) ^ a) + x6 + kk2) & m
+    c = ((((t << 6) | (t >> 26)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + ((c | (d ^ m)) ^ e) + x9 + kk2) & m
+    b = ((((t << 14) | (t >> 18)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + ((b | (c ^ m)) ^ d) + x11 + kk2) & m
+    a = ((((t << 12) | (t >> 20)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + ((a | (b ^ m)) ^ c) + x8 + kk2) & m
+    e = ((((t << 13) | (t >> 19)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + ((e | (a ^ m)) ^ b) + x12 + kk2) & m
+    d = ((((t << 5) | (t >> 27)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + ((d | (e ^ m)) ^ a) + x2 + kk2) & m
+    c = ((((t << 14) | (t >> 18)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + ((c | (d ^ m)) ^ e) + x10 + kk2) & m
+    b = ((((t << 13) | (t >> 19)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + ((b | (c ^ m)) ^ d) + x0 + kk2) & m
+    a = ((((t << 13) | (t >> 19)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + ((a | (b ^ m)) ^ c) + x4 + kk2) & m
+    e = ((((t << 7) | (t >> 25)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + ((e | (a ^ m)) ^ b) + x13 + kk2) & m
+    d = ((((t << 5) | (t >> 27)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
     # Parallel round 4
-    c, e = R(c, d, e, a, b, F1, KK3, 15,  8, x)
-    b, d = R(b, c, d, e, a, F1, KK3,  5,  6, x)
-    a, c = R(a, b, c, d, e, F1, KK3,  8,  4, x)
-    e, b = R(e, a, b, c, d, F1, KK3, 11,  1, x)
-    d, a = R(d, e, a, b, c, F1, KK3, 14,  3, x)
-    c, e = R(c, d, e, a, b, F1, KK3, 14, 11, x)
-    b, d = R(b, c, d, e, a, F1, KK3,  6, 15, x)
-    a, c = R(a, b, c, d, e, F1, KK3, 14,  0, x)
-    e, b = R(e, a, b, c, d, F1, KK3,  6,  5, x)
-    d, a = R(d, e, a, b, c, F1, KK3,  9, 12, x)
-    c, e = R(c, d, e, a, b, F1, KK3, 12,  2, x)
-    b, d = R(b, c, d, e, a, F1, KK3,  9, 13, x)
-    a, c = R(a, b, c, d, e, F1, KK3, 12,  9, x)
-    e, b = R(e, a, b, c, d, F1, KK3,  5,  7, x)
-    d, a = R(d, e, a, b, c, F1, KK3, 15, 10, x)
-    c, e = R(c, d, e, a, b, F1, KK3,  8, 14, x) # #63
+    t = (c + (a ^ (d & (e ^ a))) + x8 + kk3) & m
+    c = ((((t << 15) | (t >> 17)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (e ^ (c & (d ^ e))) + x6 + kk3) & m
+    b = ((((t << 5) | (t >> 27)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (d ^ (b & (c ^ d))) + x4 + kk3) & m
+    a = ((((t << 8) | (t >> 24)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (c ^ (a & (b ^ c))) + x1 + kk3) & m
+    e = ((((t << 11) | (t >> 21)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (b ^ (e & (a ^ b))) + x3 + kk3) & m
+    d = ((((t << 14) | (t >> 18)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (a ^ (d & (e ^ a))) + x11 + kk3) & m
+    c = ((((t << 14) | (t >> 18)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (e ^ (c & (d ^ e))) + x15 + kk3) & m
+    b = ((((t << 6) | (t >> 26)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (d ^ (b & (c ^ d))) + x0 + kk3) & m
+    a = ((((t << 14) | (t >> 18)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (c ^ (a & (b ^ c))) + x5 + kk3) & m
+    e = ((((t << 6) | (t >> 26)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (b ^ (e & (a ^ b))) + x12 + kk3) & m
+    d = ((((t << 9) | (t >> 23)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (a ^ (d & (e ^ a))) + x2 + kk3) & m
+    c = ((((t << 12) | (t >> 20)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (e ^ (c & (d ^ e))) + x13 + kk3) & m
+    b = ((((t << 9) | (t >> 23)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (d ^ (b & (c ^ d))) + x9 + kk3) & m
+    a = ((((t << 12) | (t >> 20)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (c ^ (a & (b ^ c))) + x7 + kk3) & m
+    e = ((((t << 5) | (t >> 27)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (b ^ (e & (a ^ b))) + x10 + kk3) & m
+    d = ((((t << 15) | (t >> 17)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (a ^ (d & (e ^ a))) + x14 + kk3) & m
+    c = ((((t << 8) | (t >> 24)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
     # Parallel round 5
-    b, d = R(b, c, d, e, a, F0, KK4,  8, 12, x)
-    a, c = R(a, b, c, d, e, F0, KK4,  5, 15, x)
-    e, b = R(e, a, b, c, d, F0, KK4, 12, 10, x)
-    d, a = R(d, e, a, b, c, F0, KK4,  9,  4, x)
-    c, e = R(c, d, e, a, b, F0, KK4, 12,  1, x)
-    b, d = R(b, c, d, e, a, F0, KK4,  5,  5, x)
-    a, c = R(a, b, c, d, e, F0, KK4, 14,  8, x)
-    e, b = R(e, a, b, c, d, F0, KK4,  6,  7, x)
-    d, a = R(d, e, a, b, c, F0, KK4,  8,  6, x)
-    c, e = R(c, d, e, a, b, F0, KK4, 13,  2, x)
-    b, d = R(b, c, d, e, a, F0, KK4,  6, 13, x)
-    a, c = R(a, b, c, d, e, F0, KK4,  5, 14, x)
-    e, b = R(e, a, b, c, d, F0, KK4, 15,  0, x)
-    d, a = R(d, e, a, b, c, F0, KK4, 13,  3, x)
-    c, e = R(c, d, e, a, b, F0, KK4, 11,  9, x)
-    b, d = R(b, c, d, e, a, F0, KK4, 11, 11, x) # #79
-
-    t = (state[1] + cc + d) % 0x100000000
-    state[1] = (state[2] + dd + e) % 0x100000000
-    state[2] = (state[3] + ee + a) % 0x100000000
-    state[3] = (state[4] + aa + b) % 0x100000000
-    state[4] = (state[0] + bb + c) % 0x100000000
-    state[0] = t % 0x100000000
-
-
-def RMD160Update(ctx, inp, inplen):
-    if type(inp) == str:
-        inp = [ord(i)&0xff for i in inp]
-    
-    have = int((ctx.count // 8) % 64)
-    inplen = int(inplen)
-    need = 64 - have
-    ctx.count += 8 * inplen
-    off = 0
-    if inplen >= need:
-        if have:
-            for i in range(need):
-                ctx.buffer[have + i] = inp[i]
-            RMD160Transform(ctx.state, ctx.buffer)
-            off = need
-            have = 0
-        while off + 64 <= inplen:
-            RMD160Transform(ctx.state, inp[off:]) #<---
-            off += 64
-    if off < inplen:
-        # memcpy(ctx->buffer + have, input+off, len-off)
-        for i in range(inplen - off):
-            ctx.buffer[have + i] = inp[off + i]
-
-def RMD160Final(ctx):
-    size = struct.pack("<Q", ctx.count)
-    padlen = 64 - ((ctx.count // 8) % 64)
-    if padlen < 1 + 8:
-        padlen += 64
-    RMD160Update(ctx, PADDING, padlen - 8)
-    RMD160Update(ctx, size, 8)
-    return struct.pack("<5L", *ctx.state)
+    t = (b + (c ^ d ^ e) + x12) & m
+    b = ((((t << 8) | (t >> 24)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (b ^ c ^ d) + x15) & m
+    a = ((((t << 5) | (t >> 27)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (a ^ b ^ c) + x10) & m
+    e = ((((t << 12) | (t >> 20)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (e ^ a ^ b) + x4) & m
+    d = ((((t << 9) | (t >> 23)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (d ^ e ^ a) + x1) & m
+    c = ((((t << 12) | (t >> 20)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (c ^ d ^ e) + x5) & m
+    b = ((((t << 5) | (t >> 27)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (b ^ c ^ d) + x8) & m
+    a = ((((t << 14) | (t >> 18)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (a ^ b ^ c) + x7) & m
+    e = ((((t << 6) | (t >> 26)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (e ^ a ^ b) + x6) & m
+    d = ((((t << 8) | (t >> 24)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (d ^ e ^ a) + x2) & m
+    c = ((((t << 13) | (t >> 19)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (c ^ d ^ e) + x13) & m
+    b = ((((t << 6) | (t >> 26)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+    t = (a + (b ^ c ^ d) + x14) & m
+    a = ((((t << 5) | (t >> 27)) & m) + e) & m
+    c = ((c << 10) | (c >> 22)) & m
+    t = (e + (a ^ b ^ c) + x0) & m
+    e = ((((t << 15) | (t >> 17)) & m) + d) & m
+    b = ((b << 10) | (b >> 22)) & m
+    t = (d + (e ^ a ^ b) + x3) & m
+    d = ((((t << 13) | (t >> 19)) & m) + c) & m
+    a = ((a << 10) | (a >> 22)) & m
+    t = (c + (d ^ e ^ a) + x9) & m
+    c = ((((t << 11) | (t >> 21)) & m) + b) & m
+    e = ((e << 10) | (e >> 22)) & m
+    t = (b + (c ^ d ^ e) + x11) & m
+    b = ((((t << 11) | (t >> 21)) & m) + a) & m
+    d = ((d << 10) | (d >> 22)) & m
+
+    return (
+        (h1 + cc + d) & m,
+        (h2 + dd + e) & m,
+        (h3 + ee + a) & m,
+        (h4 + aa + b) & m,
+        (h0 + bb + c) & m
+    )
 
 
 assert "37f332f68db77bd9d7edd4969571ad671cf9dd3b" == new("The quick brown fox jumps over the lazy dog").hexdigest()
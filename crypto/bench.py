@@ -0,0 +1,295 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+from . import _ripemd
+from . import ecc as default_ecc, aes as default_aes
+from .src import ecc as fallback_ecc, aes as fallback_aes
+from .src._util import int_to_bytes, bytes_to_int, ints_to_bytes, bytes_to_ints
+
+
+__all__ = [
+    "bench_ecc", "bench_aes", "bench_ripemd160", "bench_conversion", "run",
+    "main"
+]
+
+
+AES_ALGOS = [
+    "aes-{}-{}".format(bits, mode)
+    for mode in ("cbc", "ctr", "cfb", "ofb")
+    for bits in (128, 192, 256)
+]
+ECC_OPERATIONS = [
+    "keygen", "private_to_public", "sign", "verify", "verify_batch", "recover",
+    "ecdh", "encrypt", "decrypt", "derive_child"
+]
+# verify_batch is timed on this many recoverable signatures and reported per
+# signature. They are checked together, so this is where the speedup over
+# verify shows up; the report prints the ratio
+VERIFY_BATCH_SIZE = 32
+MESSAGE_SIZES = [16, 1024, 65536]
+# Every operation is repeated for at least this many seconds
+MIN_TIME = 0.2
+
+
+def _measure(func, min_time):
+    # Returns seconds per call
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / number
+        number *= 2
+
+
+def get_backends():
+    backends = {"fallback": (fallback_ecc, fallback_aes)}
+    if default_ecc is not fallback_ecc:
+        backends["native"] = (default_ecc, default_aes)
+    return backends
+
+
+def bench_ecc(ecc, curves=None, operations=None, min_time=MIN_TIME):
+    # Seconds per operation for each curve. Operations the curve doesn't
+    # support (e.g. derive_child, which is BIP32-specific) are left out
+    results = {}
+    for name in curves or ecc.CURVES:
+        curve = ecc.get_curve(name)
+        private_key = curve.new_private_key()
+        public_key = curve.private_to_public(private_key)
+        data = b"Hello, world!"
+        signature = curve.sign(data, private_key, recoverable=True)
+        ciphertext = curve.encrypt(data, public_key)
+        batch = [
+            (curve.sign(bytes([i]), private_key, recoverable=True), bytes([i]), public_key)
+            for i in range(VERIFY_BATCH_SIZE)
+        ]
+        tasks = {
+            "keygen": curve.new_private_key,
+            "private_to_public": lambda: curve.private_to_public(private_key),
+            "sign": lambda: curve.sign(data, private_key),
+            "verify": lambda: curve.verify(signature, data, public_key),
+            "verify_batch": lambda: curve.verify_batch(batch),
+            "recover": lambda: curve.recover(signature, data),
+            "ecdh": lambda: curve.derive(private_key, public_key),
+            "encrypt": lambda: curve.encrypt(data, public_key),
+            "decrypt": lambda: curve.decrypt(ciphertext, private_key),
+            "derive_child": lambda: curve.derive_child(b"Seed", 1)
+        }
+        results[name] = {}
+        for operation in operations or ECC_OPERATIONS:
+            try:
+                tasks[operation]()
+            except ValueError:
+                continue
+            results[name][operation] = _measure(tasks[operation], min_time)
+            if operation == "verify_batch":
+                results[name][operation] /= VERIFY_BATCH_SIZE
+    return results
+
+
+def bench_aes(aes, algos=None, sizes=None, min_time=MIN_TIME):
+    # Seconds per encryption and decryption for each message size
+    results = {}
+    for algo in algos or AES_ALGOS:
+        key = aes.new_key(algo)
+        results[algo] = {}
+        for size in sizes or MESSAGE_SIZES:
+            data = os.urandom(size)
+            ciphertext, iv = aes.encrypt(data, key, algo)
+            results[algo][size] = {
+                "encrypt": _measure(lambda: aes.encrypt(data, key, algo), min_time),
+                "decrypt": _measure(lambda: aes.decrypt(ciphertext, iv, key, algo), min_time)
+            }
+    return results
+
+
+def bench_ripemd160(sizes=None, min_time=MIN_TIME):
+    # The pure-Python fallback and, if available, OpenSSL via hashlib
+    implementations = {"fallback": _ripemd.new}
+    try:
+        hashlib.new("ripemd160")
+        implementations["native"] = lambda data: hashlib.new("ripemd160", data)
+    except ValueError:
+        pass
+    results = {}
+    for name, new in implementations.items():
+        results[name] = {}
+        for size in sizes or MESSAGE_SIZES:
+            data = os.urandom(size)
+            results[name][size] = _measure(lambda: new(data).digest(), min_time)
+    # Bulk fallback hashing, per message
+    results["fallback_many"] = {}
+    for size in sizes or MESSAGE_SIZES:
+        messages = [os.urandom(size) for _ in range(_ripemd.LANES)]
+        seconds = _measure(lambda: _ripemd.ripemd160_many(messages), min_time)
+        results["fallback_many"][size] = seconds / len(messages)
+    return results
+
+
+def _loop_int_to_bytes(raw, length):
+    # The byte-by-byte conversion that was used before, kept for comparison
+    data = []
+    for _ in range(length):
+        data.append(raw % 256)
+        raw //= 256
+    return bytes(data[::-1])
+
+
+def _loop_bytes_to_int(data):
+    raw = 0
+    for byte in data:
+        raw = raw * 256 + byte
+    return raw
+
+
+def _time(func, number):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def bench_conversion(number=2000):
+    # Encodes and decodes r || s buffers for every field size
+    results = {}
+    lengths = sorted(set(
+        fallback_ecc.get_curve(name)._backend.public_key_length
+        for name in fallback_ecc.CURVES
+    ))
+    for length in lengths:
+        buf = os.urandom(2 * length)
+        r, s = bytes_to_ints(buf, length, 2)
+
+        def loop():
+            _loop_int_to_bytes(r, length) + _loop_int_to_bytes(s, length)
+            _loop_bytes_to_int(buf[:length])
+            _loop_bytes_to_int(buf[length:])
+
+        def fast():
+            ints_to_bytes((r, s), length)
+            bytes_to_ints(buf, length, 2)
+
+        expected = _loop_int_to_bytes(r, length) + _loop_int_to_bytes(s, length)
+        assert ints_to_bytes((r, s), length) == expected == buf
+        assert int_to_bytes(bytes_to_int(buf), 2 * length) == buf
+
+        results[length * 8] = {
+            "loop": _time(loop, number),
+            "fast": _time(fast, number)
+        }
+    return results
+
+
+def run(
+    curves=None, operations=None, algos=None, sizes=None, min_time=MIN_TIME,
+    suites=("ecc", "aes", "ripemd160")
+):
+    results = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "backends": {}
+    }
+    for backend, (ecc, aes) in get_backends().items():
+        results["backends"][backend] = {
+            "ecc": bench_ecc(ecc, curves, operations, min_time) if "ecc" in suites else {},
+            "aes": bench_aes(aes, algos, sizes, min_time) if "aes" in suites else {}
+        }
+    if "ripemd160" in suites:
+        results["ripemd160"] = bench_ripemd160(sizes, min_time)
+    if "conversion" in suites:
+        results["conversion"] = bench_conversion()
+    return results
+
+
+def _print_report(results, file):
+    for backend, backend_results in results["backends"].items():
+        for curve, operations in backend_results["ecc"].items():
+            print("{} {:<16}".format(backend, curve), " ".join(
+                "{}={:.3f}ms".format(operation, seconds * 1e3)
+                for operation, seconds in operations.items()
+            ), file=file)
+            if "verify" in operations and "verify_batch" in operations:
+                print("{} {:<16} verify_batch {:.1f}x faster than verify".format(
+                    backend, curve, operations["verify"] / operations["verify_batch"]
+                ), file=file)
+        for algo, sizes in backend_results["aes"].items():
+            print("{} {:<16}".format(backend, algo), " ".join(
+                "{}B={:.2f}/{:.2f}MB/s".format(
+                    size, size / r["encrypt"] / 1e6, size / r["decrypt"] / 1e6
+                )
+                for size, r in sizes.items()
+            ), file=file)
+    for implementation, sizes in results.get("ripemd160", {}).items():
+        print("{} {:<16}".format(implementation, "ripemd160"), " ".join(
+            "{}B={:.2f}MB/s".format(size, size / seconds / 1e6)
+            for size, seconds in sizes.items()
+        ), file=file)
+    for bits, r in results.get("conversion", {}).items():
+        print("conversion {:>4} bits: loop {:.2f} us, fast {:.2f} us, {:.1f}x".format(
+            bits, r["loop"] * 1e6, r["fast"] * 1e6, r["loop"] / r["fast"]
+        ), file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m sslcrypto.bench",
+        description="Benchmark sslcrypto backends"
+    )
+    parser.add_argument(
+        "--curve", action="append", dest="curves", choices=sorted(fallback_ecc.CURVES),
+        help="curve to benchmark, may be repeated (default: all)"
+    )
+    parser.add_argument(
+        "--operation", action="append", dest="operations", choices=ECC_OPERATIONS,
+        help="ECC operation, may be repeated (default: all)"
+    )
+    parser.add_argument(
+        "--algo", action="append", dest="algos", choices=AES_ALGOS,
+        help="AES algorithm, may be repeated (default: all)"
+    )
+    parser.add_argument(
+        "--size", action="append", dest="sizes", type=int,
+        help="message size in bytes, may be repeated (default: {})".format(MESSAGE_SIZES)
+    )
+    parser.add_argument(
+        "--suite", action="append", dest="suites",
+        choices=["ecc", "aes", "ripemd160", "conversion"],
+        help="suite to run, may be repeated (default: ecc, aes, ripemd160)"
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=MIN_TIME,
+        help="seconds to spend on each measurement"
+    )
+    parser.add_argument(
+        "--json", metavar="FILE",
+        help="write results as JSON to FILE, - for stdout"
+    )
+    args = parser.parse_args(argv)
+
+    results = run(
+        curves=args.curves,
+        operations=args.operations,
+        algos=args.algos,
+        sizes=args.sizes,
+        min_time=args.min_time,
+        suites=args.suites or ("ecc", "aes", "ripemd160")
+    )
+    if args.json == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        _print_report(results, sys.stdout)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import bisect
+import contextlib
+import functools
+import threading
+import time
+from . import _aes, _ecc
+
+
+__all__ = ["Stats", "enable", "disable", "is_enabled", "stats", "reset", "profile"]
+
+
+# Upper bounds of timing histogram buckets, in seconds. The last bucket
+# collects everything slower
+HISTOGRAM_BOUNDS = (1e-5, 3e-5, 1e-4, 3e-4, 1e-3, 3e-3, 1e-2, 3e-2, 0.1, 0.3, 1.0)
+
+# Timed methods: object attribute -> operation name. Timings are inclusive,
+# e.g. decrypt includes the hash and decode_public_key calls it makes
+CURVE_OPERATIONS = {
+    "private_to_public": "private_to_public",
+    "derive": "derive",
+    "sign": "sign",
+    "verify": "verify",
+    "verify_batch": "verify_batch",
+    "recover": "recover",
+    "encrypt": "encrypt",
+    "decrypt": "decrypt",
+    "encrypt_stream": "encrypt_stream",
+    "decrypt_stream": "decrypt_stream",
+    "derive_child": "derive_child",
+    "multi_scalar_multiply": "multi_scalar_multiply",
+    "_decode_public_key": "decode_public_key",
+    "_digest": "hash"
+}
+JACOBIAN_OPERATIONS = {
+    "is_valid_public_key": "validate",
+    "jacobian_multiply": "multiply",
+    "jacobian_multiply_fixed_base": "multiply_fixed_base",
+    "jacobian_interleave": "multi_multiply"
+}
+AES_OPERATIONS = {
+    "encrypt": "encrypt",
+    "decrypt": "decrypt",
+    "encryptor": "encryptor",
+    "decryptor": "decryptor"
+}
+# Counted methods of JacobianCurve. Each conversion to affine coordinates
+# costs exactly one field inversion
+JACOBIAN_COUNTERS = {
+    "jacobian_add": "add",
+    "jacobian_double": "double",
+    "from_jacobian": "inversion",
+    "batch_from_jacobian": "inversion"
+}
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._counters = {}
+
+
+    def record(self, scope, operation, seconds):
+        with self._lock:
+            timing = self._timings.get((scope, operation))
+            if timing is None:
+                histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+                timing = self._timings[scope, operation] = [0, 0.0, histogram]
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2][bisect.bisect_left(HISTOGRAM_BOUNDS, seconds)] += 1
+
+
+    def count(self, scope, name):
+        with self._lock:
+            self._counters[scope, name] = self._counters.get((scope, name), 0) + 1
+
+
+    def snapshot(self):
+        # {"timings": {scope: {operation: {"count", "total", "histogram"}}},
+        #  "counters": {scope: {name: count}}}. Scope is the curve name, or
+        # "aes"
+        with self._lock:
+            timings, counters = {}, {}
+            for (scope, operation), (count, total, histogram) in self._timings.items():
+                timings.setdefault(scope, {})[operation] = {
+                    "count": count,
+                    "total": total,
+                    "histogram": list(histogram)
+                }
+            for (scope, name), count in self._counters.items():
+                counters.setdefault(scope, {})[name] = count
+            return {"timings": timings, "counters": counters}
+
+
+_lock = threading.RLock()
+_stats = Stats()
+_callback = None
+# (object, attribute, previous instance attribute) of everything wrapped
+_patched = []
+_MISSING = object()
+
+
+def _timed(scope, operation, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            _stats.record(scope, operation, seconds)
+            callback = _callback
+            if callback is not None:
+                callback(scope, operation, seconds)
+    wrapper._instrumented = True
+    return wrapper
+
+
+def _counted(scope, name, func):
+    @functools.wraps(func)
+    def wrapper(*args):
+        _stats.count(scope, name)
+        return func(*args)
+    wrapper._instrumented = True
+    return wrapper
+
+
+def _patch(obj, attributes, scope, wrap):
+    # Methods are shadowed by instance attributes, so there is no overhead at
+    # all once they are removed. Some methods are already chosen per instance
+    # (e.g. field-specific point formulas); those are put back on disable
+    for attribute, name in attributes.items():
+        if not hasattr(obj, attribute) or hasattr(vars(obj).get(attribute), "_instrumented"):
+            continue
+        previous = vars(obj).get(attribute, _MISSING)
+        setattr(obj, attribute, wrap(scope, name, getattr(obj, attribute)))
+        _patched.append((obj, attribute, previous))
+
+
+def _instrument_curve(curve):
+    _patch(curve, CURVE_OPERATIONS, curve.name, _timed)
+    jacobian = getattr(curve._backend, "jacobian", None)
+    if jacobian is not None:
+        _patch(jacobian, JACOBIAN_OPERATIONS, curve.name, _timed)
+        _patch(jacobian, JACOBIAN_COUNTERS, curve.name, _counted)
+
+
+def _on_new_curve(curve):
+    # Called by ECC.get_curve with the curve lock held, so enable() must not
+    # take curve locks while holding _lock
+    with _lock:
+        _instrument_curve(curve)
+
+
+def enable(callback=None):
+    # Starts collecting statistics for all curves and AES objects.
+    # callback(scope, operation, seconds) is called after every timed
+    # operation, e.g. to export to a metrics system
+    global _callback
+    with _lock:
+        _callback = callback
+        if is_enabled():
+            return
+        _ecc._new_curve_hooks.append(_on_new_curve)
+        for ecc in list(_ecc._ecc_instances.values()):
+            for curve in list(ecc._curves.values()):
+                _instrument_curve(curve)
+        for aes in list(_aes._aes_instances.values()):
+            _patch(aes, AES_OPERATIONS, "aes", _timed)
+
+
+def disable():
+    global _callback
+    with _lock:
+        if _on_new_curve in _ecc._new_curve_hooks:
+            _ecc._new_curve_hooks.remove(_on_new_curve)
+        for obj, attribute, previous in _patched:
+            if previous is _MISSING:
+                delattr(obj, attribute)
+            else:
+                setattr(obj, attribute, previous)
+        _patched.clear()
+        _callback = None
+
+
+def is_enabled():
+    return _on_new_curve in _ecc._new_curve_hooks
+
+
+def stats():
+    return _stats.snapshot()
+
+
+def reset():
+    global _stats
+    _stats = Stats()
+
+
+@contextlib.contextmanager
+def profile(callback=None):
+    # Collects statistics for the block into a fresh Stats object. Calls from
+    # other threads made meanwhile are counted as well
+    global _stats, _callback
+    with _lock:
+        was_enabled = is_enabled()
+        old_stats, old_callback = _stats, _callback
+        _stats = Stats()
+        enable(callback)
+    try:
+        yield _stats
+    finally:
+        with _lock:
+            if was_enabled:
+                _callback = old_callback
+            else:
+                disable()
+            _stats = old_stats
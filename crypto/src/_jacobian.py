@@ -29,7 +29,51 @@ THE SOFTWARE.
 """
 
 
-from ._util import inverse
+import threading
+from .._lru import LRUCache
+from ._util import inverse, batch_inverse, isqrt, mersenne_reducer, square_root_function
+
+
+# Width of a digit in precomputed fixed-base tables
+BASE_WINDOW = 4
+# Wider fixed-base table for bulk key generation. It halves the number of
+# additions per key, but takes about as long to build as 500 multiplications
+WIDE_BASE_WINDOW = 8
+# Width of wNAF digits for the generator, whose odd multiples are cached
+BASE_WNAF_WINDOW = 7
+# Default window widths for variable-base multiplication of public and secret
+# scalars
+WNAF_WINDOW = 5
+FIXED_WINDOW = 4
+# Multi-scalar multiplication switches from interleaved wNAF to Pippenger's
+# bucket method at this many points
+PIPPENGER_THRESHOLD = 64
+# How many validated public keys to remember per curve
+VALID_PUBLIC_KEYS_CACHE_SIZE = 1024
+
+# The point at infinity in Jacobian coordinates. It's the only point with
+# x = y = 0: (0, 0) isn't on any curve we support, because b != 0. Points of
+# order 2 have y = 0 as well, so y alone doesn't identify infinity
+INFINITY = (0, 0, 1)
+
+
+def wnaf(n, window):
+    # Width-w non-adjacent form, least significant digit first. Every non-zero
+    # digit is odd and lies in (-2 ** (w - 1), 2 ** (w - 1))
+    digits = []
+    full = 1 << window
+    half = full >> 1
+    while n:
+        if n & 1:
+            digit = n & (full - 1)
+            if digit >= half:
+                digit -= full
+            n -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        n >>= 1
+    return digits
 
 
 class JacobianCurve:
@@ -40,6 +84,84 @@ class JacobianCurve:
         self.b = b
         self.g = g
         self.n_length = len(bin(self.n).replace("0b", ""))
+        # By Hasse's theorem, the number of points is within 2 * sqrt(p) of
+        # p + 1
+        self.cofactor = (self.p + 1 + 2 * isqrt(self.p)) // self.n
+
+        # Doubling formulas are specialized for a = 0 (secp*k1) and a = -3
+        # (secp*r1, prime*v1). For a Mersenne prime, reducing the
+        # double-length products is several times faster than %
+        self._reduce = mersenne_reducer(p)
+        if self._reduce is not None:
+            if a == p - 3:
+                self.jacobian_double = self._jacobian_double_mersenne_a3
+            else:
+                self.jacobian_double = self._jacobian_double_mersenne
+            self.jacobian_add = self._jacobian_add_mersenne
+        elif a == 0:
+            self.jacobian_double = self._jacobian_double_a0
+        elif a == p - 3:
+            self.jacobian_double = self._jacobian_double_a3
+
+        # GLV endomorphism (x, y) -> (beta * x, y), which equals multiplication
+        # by lambda, for curves with a = 0 (e.g. secp256k1). Scalars are split
+        # into two halves that share one chain of doublings
+        self._glv = None
+        if a == 0 and p % 3 == 1 and n % 3 == 1 and self.cofactor == 1:
+            self._glv = self._glv_parameters()
+
+        # Public keys that passed is_on_curve
+        self._valid_public_keys = LRUCache(VALID_PUBLIC_KEYS_CACHE_SIZE)
+
+        # Multiples of the generator, built on first use
+        self._base_table = None
+        self._wide_base_table = None
+        self._base_wnaf_table = None
+        self._base_glv_table = None
+        self._base_table_lock = threading.Lock()
+
+
+    def _glv_parameters(self):
+        # Non-trivial cube roots of unity are (-1 +- sqrt(-3)) / 2
+        beta = (square_root_function(self.p)(self.p - 3) - 1) * inverse(2, self.p) % self.p
+        lam = (square_root_function(self.n)(self.n - 3) - 1) * inverse(2, self.n) % self.n
+        # There are two choices of each, and only matching ones work
+        g = self.to_jacobian(self.g)
+        x, _ = self.from_jacobian(self._multiply_fixed_window(g, lam, FIXED_WINDOW))
+        if x != beta * self.g[0] % self.p:
+            beta = beta * beta % self.p
+
+        # Short basis of the lattice {(a, b): a + b * lambda = 0 mod n}, from
+        # the extended Euclidean algorithm on n and lambda
+        remainders, coefficients = [self.n, lam], [0, 1]
+        while remainders[-2] ** 2 >= self.n:
+            q = remainders[-2] // remainders[-1]
+            remainders.append(remainders[-2] - q * remainders[-1])
+            coefficients.append(coefficients[-2] - q * coefficients[-1])
+        # remainders[-3] is the last one that is at least sqrt(n)
+        a1, b1 = remainders[-2], -coefficients[-2]
+        a2, b2 = min(
+            (remainders[-3], -coefficients[-3]),
+            (remainders[-1], -coefficients[-1]),
+            key=lambda v: v[0] ** 2 + v[1] ** 2
+        )
+        # Both halves of a split scalar fit in this many bits
+        length = max((abs(a1) + abs(a2)).bit_length(), (abs(b1) + abs(b2)).bit_length())
+        return beta, lam, (a1, b1, a2, b2), length
+
+
+    def glv_split(self, k):
+        # k1 + k2 * lambda = k mod n, where k1 and k2 are about half as long
+        # as n and may be negative
+        a1, b1, a2, b2 = self._glv[2]
+        c1 = (2 * b2 * k + self.n) // (2 * self.n)
+        c2 = (-2 * b1 * k + self.n) // (2 * self.n)
+        return k - c1 * a1 - c2 * a2, -c1 * b1 - c2 * b2
+
+
+    def jacobian_endomorphism(self, p):
+        # lambda * p for curves with a GLV endomorphism
+        return self._glv[0] * p[0] % self.p, p[1], p[2]
 
 
     def isinf(self, p):
@@ -51,8 +173,12 @@ class JacobianCurve:
 
 
     def jacobian_double(self, p):
+        # pylint: disable=method-hidden
+        # Generic formula, replaced per instance by __init__ for a = 0, a = -3
+        # and Mersenne primes
         if not p[1]:
-            return 0, 0, 0
+            # Infinity, or a point of order 2
+            return INFINITY
         ysq = (p[1] ** 2) % self.p
         s = (4 * p[0] * ysq) % self.p
         m = (3 * p[0] ** 2 + self.a * p[2] ** 4) % self.p
@@ -62,27 +188,138 @@ class JacobianCurve:
         return nx, ny, nz
 
 
-    def jacobian_add(self, p, q):
+    def _jacobian_double_a0(self, p):
+        # jacobian_double for a = 0
+        if not p[1]:
+            return INFINITY
+        x, y, z = p
+        ysq = (y * y) % self.p
+        s = (4 * x * ysq) % self.p
+        m = (3 * x * x) % self.p
+        nx = (m * m - 2 * s) % self.p
+        ny = (m * (s - nx) - 8 * ysq * ysq) % self.p
+        nz = (2 * y * z) % self.p
+        return nx, ny, nz
+
+
+    def _jacobian_double_a3(self, p):
+        # jacobian_double for a = -3, where 3x^2 + az^4 = 3(x - z^2)(x + z^2)
         if not p[1]:
+            return INFINITY
+        x, y, z = p
+        ysq = (y * y) % self.p
+        s = (4 * x * ysq) % self.p
+        z2 = (z * z) % self.p
+        m = (3 * (x - z2) * (x + z2)) % self.p
+        nx = (m * m - 2 * s) % self.p
+        ny = (m * (s - nx) - 8 * ysq * ysq) % self.p
+        nz = (2 * y * z) % self.p
+        return nx, ny, nz
+
+
+    def jacobian_add(self, p, q):
+        # pylint: disable=method-hidden
+        # Generic formula, replaced per instance by __init__ for Mersenne primes
+        if not p[1] and not p[0]:
             return q
-        if not q[1]:
+        if not q[1] and not q[0]:
             return p
-        u1 = (p[0] * q[2] ** 2) % self.p
-        u2 = (q[0] * p[2] ** 2) % self.p
-        s1 = (p[1] * q[2] ** 3) % self.p
-        s2 = (q[1] * p[2] ** 3) % self.p
+        if p[2] == 1:
+            p, q = q, p
+        x1, y1, z1 = p
+        x2, y2, z2 = q
+        z1z1 = (z1 * z1) % self.p
+        if z2 == 1:
+            # Mixed addition, e.g. of precomputed multiples
+            u1, s1 = x1, y1
+            u2 = (x2 * z1z1) % self.p
+            s2 = (y2 * z1 * z1z1) % self.p
+        else:
+            z2z2 = (z2 * z2) % self.p
+            u1 = (x1 * z2z2) % self.p
+            u2 = (x2 * z1z1) % self.p
+            s1 = (y1 * z2 * z2z2) % self.p
+            s2 = (y2 * z1 * z1z1) % self.p
         if u1 == u2:
             if s1 != s2:
-                return (0, 0, 1)
+                return INFINITY
             return self.jacobian_double(p)
         h = u2 - u1
         r = s2 - s1
         h2 = (h * h) % self.p
         h3 = (h * h2) % self.p
         u1h2 = (u1 * h2) % self.p
-        nx = (r ** 2 - h3 - 2 * u1h2) % self.p
+        nx = (r * r - h3 - 2 * u1h2) % self.p
         ny = (r * (u1h2 - nx) - s1 * h3) % self.p
-        nz = (h * p[2] * q[2]) % self.p
+        nz = (h * z1 * z2) % self.p
+        return (nx, ny, nz)
+
+
+    def _jacobian_double_mersenne(self, p):
+        # Same as jacobian_double
+        if not p[1]:
+            return INFINITY
+        red = self._reduce
+        ysq = red(p[1] * p[1])
+        s = red(4 * p[0] * ysq)
+        z2 = red(p[2] * p[2])
+        m = red(3 * p[0] * p[0] + self.a * red(z2 * z2))
+        nx = red(m * m - 2 * s)
+        ny = red(m * (s - nx) - 8 * red(ysq * ysq))
+        nz = red(2 * p[1] * p[2])
+        return nx, ny, nz
+
+
+    def _jacobian_double_mersenne_a3(self, p):
+        # Same as _jacobian_double_a3
+        if not p[1]:
+            return INFINITY
+        red = self._reduce
+        x, y, z = p
+        ysq = red(y * y)
+        s = red(4 * x * ysq)
+        z2 = red(z * z)
+        m = red(3 * red((x - z2) * (x + z2)))
+        nx = red(m * m - 2 * s)
+        ny = red(m * (s - nx) - 8 * red(ysq * ysq))
+        nz = red(2 * y * z)
+        return nx, ny, nz
+
+
+    def _jacobian_add_mersenne(self, p, q):
+        # Same as jacobian_add
+        if not p[1] and not p[0]:
+            return q
+        if not q[1] and not q[0]:
+            return p
+        if p[2] == 1:
+            p, q = q, p
+        red = self._reduce
+        x1, y1, z1 = p
+        x2, y2, z2 = q
+        z1z1 = red(z1 * z1)
+        if z2 == 1:
+            u1, s1 = x1, y1
+            u2 = red(x2 * z1z1)
+            s2 = red(y2 * red(z1 * z1z1))
+        else:
+            z2z2 = red(z2 * z2)
+            u1 = red(x1 * z2z2)
+            u2 = red(x2 * z1z1)
+            s1 = red(y1 * red(z2 * z2z2))
+            s2 = red(y2 * red(z1 * z1z1))
+        if u1 == u2:
+            if s1 != s2:
+                return INFINITY
+            return self.jacobian_double(p)
+        h = u2 - u1
+        r = s2 - s1
+        h2 = red(h * h)
+        h3 = red(h * h2)
+        u1h2 = red(u1 * h2)
+        nx = red(r * r - h3 - 2 * u1h2)
+        ny = red(r * (u1h2 - nx) - s1 * h3)
+        nz = red(h * red(z1 * z2))
         return (nx, ny, nz)
 
 
@@ -91,69 +328,358 @@ class JacobianCurve:
         return (p[0] * z ** 2) % self.p, (p[1] * z ** 3) % self.p
 
 
-    def jacobian_multiply(self, a, n, secret=False):
-        if a[1] == 0 or n == 0:
-            return 0, 0, 1
+    def batch_from_jacobian(self, points):
+        # One field inversion for the whole batch
+        res = []
+        for p, z in zip(points, batch_inverse([p[2] for p in points], self.p)):
+            z2 = z * z % self.p
+            res.append(((p[0] * z2) % self.p, (p[1] * z2 * z) % self.p))
+        return res
+
+
+    def jacobian_negate(self, p):
+        return p[0], (-p[1]) % self.p, p[2]
+
+
+    def _odd_multiples(self, a, count):
+        # a, 3a, 5a, ..., (2 * count - 1)a
+        res = [a]
+        a2 = self.jacobian_double(a)
+        for _ in range(count - 1):
+            res.append(self.jacobian_add(res[-1], a2))
+        return res
+
+
+    def jacobian_multiply(self, a, n, secret=False, window=None):
+        if self.isinf(a) or n == 0:
+            return INFINITY
         if n == 1:
             return a
         if n < 0 or n >= self.n:
-            return self.jacobian_multiply(a, n % self.n, secret)
-        half = self.jacobian_multiply(a, n // 2, secret)
-        half_sq = self.jacobian_double(half)
+            n %= self.n
+            if n == 0:
+                return INFINITY
         if secret:
-            # A constant-time implementation
-            half_sq_a = self.jacobian_add(half_sq, a)
-            if n % 2 == 0:
-                result = half_sq
-            if n % 2 == 1:
-                result = half_sq_a
-            return result
+            return self._multiply_fixed_window(a, n, window or FIXED_WINDOW)
         else:
-            if n % 2 == 0:
-                return half_sq
-            return self.jacobian_add(half_sq, a)
+            window = window or WNAF_WINDOW
+            return self.jacobian_interleave(self.wnaf_terms(n, window, self.wnaf_table(a, window)))
+
+
+    def _multiply_fixed_window(self, a, n, window):
+        # Every digit, including zero ones, costs exactly `window` doublings
+        # and one addition. The number of digits depends on the curve order
+        # only
+        table = [INFINITY, a]
+        for _ in range(2, 1 << window):
+            table.append(self.jacobian_add(table[-1], a))
+        if self._glv is None:
+            terms = [(n, table)]
+            length = self.n_length
+        else:
+            n1, n2 = self.glv_split(n)
+            terms = [(n1, table), (n2, [self.jacobian_endomorphism(q) for q in table])]
+            terms = [
+                (-k, [self.jacobian_negate(q) for q in table]) if k < 0 else (k, table)
+                for k, table in terms
+            ]
+            length = self._glv[3]
+        mask = (1 << window) - 1
+        res = INFINITY
+        for i in range((length + window - 1) // window - 1, -1, -1):
+            for _ in range(window):
+                res = self.jacobian_double(res)
+            for k, table in terms:
+                digit = (k >> (window * i)) & mask
+                res_q = self.jacobian_add(res, table[digit or 1])  # Try not to leak
+                if digit:
+                    res = res_q
+        return res
+
+
+    def wnaf_table(self, a, window):
+        table = self._odd_multiples(a, 1 << (window - 2))
+        return table, [self.jacobian_negate(q) for q in table]
+
+
+    def glv_table(self, tables):
+        # wnaf_table(lambda * a) from wnaf_table(a)
+        table, neg_table = tables
+        return (
+            [self.jacobian_endomorphism(q) for q in table],
+            [self.jacobian_endomorphism(q) for q in neg_table]
+        )
+
+
+    def wnaf_terms(self, k, window, tables, glv_tables=None):
+        # Terms of jacobian_interleave that add up to k * a, where tables is
+        # wnaf_table(a, window) and k is reduced modulo n. With GLV, this is
+        # k1 * a + k2 * (lambda * a)
+        if self._glv is None or k.bit_length() <= self._glv[3]:
+            # Already short
+            return [(wnaf(k, window),) + tuple(tables)]
+        terms = []
+        glv_tables = glv_tables or self.glv_table(tables)
+        for k, (table, neg_table) in zip(self.glv_split(k), (tables, glv_tables)):
+            if k < 0:
+                k, table, neg_table = -k, neg_table, table
+            terms.append((wnaf(k, window), table, neg_table))
+        return terms
+
+
+    def jacobian_interleave(self, terms):
+        # Interleaved wNAF (Straus): terms are (digits, table, neg_table)
+        # triples, and all of them share one chain of doublings
+        length = max([len(digits) for digits, _, _ in terms], default=0)
+        adds = [[] for _ in range(length)]
+        for digits, table, neg_table in terms:
+            for i, digit in enumerate(digits):
+                if digit > 0:
+                    adds[i].append(table[digit >> 1])
+                elif digit < 0:
+                    adds[i].append(neg_table[-digit >> 1])
+        res = INFINITY
+        for points in reversed(adds):
+            res = self.jacobian_double(res)
+            for q in points:
+                res = self.jacobian_add(res, q)
+        return res
 
 
-    def jacobian_shamir(self, a, n, b, m):
-        ab = self.jacobian_add(a, b)
+    def jacobian_shamir(self, a, n, b, m, window=None):
+        window = window or WNAF_WINDOW
         if n < 0 or n >= self.n:
             n %= self.n
         if m < 0 or m >= self.n:
             m %= self.n
-        res = 0, 0, 1  # point on infinity
-        for i in range(self.n_length - 1, -1, -1):
-            res = self.jacobian_double(res)
-            has_n = n & (1 << i)
-            has_m = m & (1 << i)
-            if has_n:
-                if has_m == 0:
-                    res = self.jacobian_add(res, a)
-                if has_m != 0:
-                    res = self.jacobian_add(res, ab)
+        terms = []
+        for point, k in ((a, n), (b, m)):
+            if k == 0 or self.isinf(point):
+                continue
+            terms += self.wnaf_terms(k, window, self.wnaf_table(point, window))
+        return self.jacobian_interleave(terms)
+
+
+    def jacobian_shamir_base(self, n, b, m):
+        # Same as jacobian_shamir(G, n, b, m), using cached multiples of G
+        if n < 0 or n >= self.n:
+            n %= self.n
+        if m < 0 or m >= self.n:
+            m %= self.n
+        terms = self.base_wnaf_terms(n)
+        if not self.isinf(b):
+            terms += self.wnaf_terms(m, WNAF_WINDOW, self.wnaf_table(b, WNAF_WINDOW))
+        return self.jacobian_interleave(terms)
+
+
+    def multi_scalar_multiply(self, pairs):
+        # sum(k * a for a, k in pairs). Equal points are merged, so e.g. G may
+        # occur several times
+        scalars = {}
+        for a, k in pairs:
+            if not self.isinf(a):
+                scalars[a] = scalars.get(a, 0) + k
+        items = []
+        for a, k in scalars.items():
+            k %= self.n
+            if k:
+                items.append((a, k))
+        if len(items) >= PIPPENGER_THRESHOLD:
+            return self._multiply_pippenger(items)
+        # Interleaved wNAF. It also beats joint sparse form for two points,
+        # because w-bit windows have fewer non-zero digits than JSF
+        g = self.to_jacobian(self.g)
+        terms = []
+        for a, k in items:
+            if a == g:
+                terms += self.base_wnaf_terms(k)
             else:
-                if has_m == 0:
-                    res = self.jacobian_add(res, (0, 0, 1))  # Try not to leak
-                if has_m != 0:
-                    res = self.jacobian_add(res, b)
+                terms += self.wnaf_terms(k, WNAF_WINDOW, self.wnaf_table(a, WNAF_WINDOW))
+        return self.jacobian_interleave(terms)
+
+
+    def _multiply_pippenger(self, items):
+        # Points are added to buckets by window digit, and the buckets are
+        # summed with a running sum, so there are no per-point tables at all
+        if self._glv is not None:
+            split = []
+            for a, k in items:
+                if k.bit_length() <= self._glv[3]:
+                    split.append((a, k))
+                    continue
+                k1, k2 = self.glv_split(k)
+                split += [(a, k1), (self.jacobian_endomorphism(a), k2)]
+            items = [(self.jacobian_negate(a), -k) if k < 0 else (a, k) for a, k in split if k]
+        # With z = 1, every addition to a bucket is a mixed one
+        points = self.normalize([a for a, _ in items])
+        points = [(a, self.jacobian_negate(a)) for a in points]
+        scalars = [k for _, k in items]
+
+        length = max(k.bit_length() for k in scalars) + 1
+        # Each window costs an addition per point plus 2 ** window to sum the
+        # buckets up
+        window = min(range(1, 17), key=lambda w: -(-length // w) * (len(points) + (1 << w)))
+        count = -(-length // window)
+        full = 1 << window
+        half = full >> 1
+
+        # Signed digits in [-half, half]
+        digits = []
+        for k in scalars:
+            row = []
+            for _ in range(count):
+                digit = k & (full - 1)
+                k >>= window
+                if digit > half:
+                    digit -= full
+                    k += 1
+                row.append(digit)
+            digits.append(row)
+
+        res = INFINITY
+        for i in range(count - 1, -1, -1):
+            for _ in range(window):
+                res = self.jacobian_double(res)
+            buckets = [INFINITY] * (half + 1)
+            for (a, neg_a), row in zip(points, digits):
+                digit = row[i]
+                if digit > 0:
+                    buckets[digit] = self.jacobian_add(buckets[digit], a)
+                elif digit < 0:
+                    buckets[-digit] = self.jacobian_add(buckets[-digit], neg_a)
+            # sum(j * buckets[j])
+            running = total = INFINITY
+            for bucket in reversed(buckets[1:]):
+                running = self.jacobian_add(running, bucket)
+                total = self.jacobian_add(total, running)
+            res = self.jacobian_add(res, total)
+        return res
+
+
+    def _get_base_table(self):
+        if self._base_table is None:
+            with self._base_table_lock:
+                if self._base_table is None:
+                    self._base_table = self.fixed_base_table(self.to_jacobian(self.g))
+        return self._base_table
+
+
+    def get_wide_base_table(self):
+        if self._wide_base_table is None:
+            with self._base_table_lock:
+                if self._wide_base_table is None:
+                    g = self.to_jacobian(self.g)
+                    self._wide_base_table = self.fixed_base_table(g, WIDE_BASE_WINDOW)
+        return self._wide_base_table
+
+
+    def get_base_wnaf_table(self):
+        # Odd multiples of G for interleaved multiplication, e.g. in verify
+        if self._base_wnaf_table is None:
+            with self._base_table_lock:
+                if self._base_wnaf_table is None:
+                    table, neg_table = self.wnaf_table(self.to_jacobian(self.g), BASE_WNAF_WINDOW)
+                    self._base_wnaf_table = self.normalize(table), self.normalize(neg_table)
+        return self._base_wnaf_table
+
+
+    def base_wnaf_terms(self, n):
+        # wnaf_terms for n * G with cached tables
+        tables = self.get_base_wnaf_table()
+        if self._glv is None:
+            return self.wnaf_terms(n, BASE_WNAF_WINDOW, tables)
+        if self._base_glv_table is None:
+            glv_tables = self.glv_table(tables)
+            with self._base_table_lock:
+                self._base_glv_table = glv_tables
+        return self.wnaf_terms(n, BASE_WNAF_WINDOW, tables, self._base_glv_table)
+
+
+    def normalize(self, points):
+        # Convert to Jacobian coordinates with z = 1
+        return [self.to_jacobian(p) for p in self.batch_from_jacobian(points)]
+
+
+    def fixed_base_table(self, a, window=BASE_WINDOW):
+        # table[i][j] = j * 2 ** (window * i) * a, stored with z = 1 so that a
+        # multiplication by a is just one addition per digit
+        table = []
+        base = a
+        for _ in range((self.n_length + window - 1) // window):
+            row = [base]
+            for _ in range(2, 1 << window):
+                row.append(self.jacobian_add(row[-1], base))
+            base = self.jacobian_add(row[-1], base)
+            table.append(row)
+        points = iter(self.normalize([q for row in table for q in row]))
+        return [[INFINITY] + [next(points) for _ in row] for row in table]
+
+
+    def jacobian_multiply_fixed_base(self, table, n, secret=False):
+        if n < 0 or n >= self.n:
+            n %= self.n
+        window = len(table[0]).bit_length() - 1
+        mask = (1 << window) - 1
+        res = INFINITY
+        for row in table:
+            digit = n & mask
+            n >>= window
+            if secret:
+                # Perform an addition for zero digits as well, and throw it
+                # away. Try not to leak
+                res_q = self.jacobian_add(res, row[digit or 1])
+                if digit:
+                    res = res_q
+            elif digit:
+                res = self.jacobian_add(res, row[digit])
         return res
 
 
+    def jacobian_multiply_base(self, n, secret=False):
+        return self.jacobian_multiply_fixed_base(self._get_base_table(), n, secret)
+
+
     def fast_multiply(self, a, n, secret=False):
+        if a == self.g:
+            return self.fast_multiply_base(n, secret)
         return self.from_jacobian(self.jacobian_multiply(self.to_jacobian(a), n, secret))
 
 
+    def fast_multiply_base(self, n, secret=False):
+        return self.from_jacobian(self.jacobian_multiply_base(n, secret))
+
+
     def fast_add(self, a, b):
         return self.from_jacobian(self.jacobian_add(self.to_jacobian(a), self.to_jacobian(b)))
 
 
     def fast_shamir(self, a, n, b, m):
+        if a == self.g:
+            return self.from_jacobian(self.jacobian_shamir_base(n, self.to_jacobian(b), m))
         return self.from_jacobian(self.jacobian_shamir(self.to_jacobian(a), n, self.to_jacobian(b), m))
 
 
     def is_on_curve(self, a):
         x, y = a
+        if not 0 <= x < self.p or not 0 <= y < self.p:
+            return False
         # Simple arithmetic check
         if (pow(x, 3, self.p) + self.a * x + self.b) % self.p != y * y % self.p:
             return False
-        # nP = point-at-infinity
-        return self.isinf(self.jacobian_multiply(self.to_jacobian(a), self.n))
+        if self.cofactor == 1:
+            # Every point on the curve belongs to the prime-order group
+            return True
+        # nP = point-at-infinity. jacobian_multiply reduces the multiplier
+        # modulo n, so the wNAF is computed explicitly
+        table, neg_table = self.wnaf_table(self.to_jacobian(a), WNAF_WINDOW)
+        return self.isinf(self.jacobian_interleave([(wnaf(self.n, WNAF_WINDOW), table, neg_table)]))
+
+
+    def is_valid_public_key(self, a):
+        a = tuple(a)
+        if self._valid_public_keys.get(a):
+            return True
+        if not self.is_on_curve(a):
+            return False
+        self._valid_public_keys.put(a, True)
+        return True
@@ -1,16 +1,40 @@
 def int_to_bytes(raw, length):
-    data = []
-    for _ in range(length):
-        data.append(raw % 256)
-        raw //= 256
-    return bytes(data[::-1])
+    # Fixed-width big-endian encoding
+    try:
+        return raw.to_bytes(length, "big")
+    except OverflowError:
+        raise ValueError("Integer does not fit into {} bytes".format(length)) from None
 
 
-def bytes_to_int(data):
-    raw = 0
-    for byte in data:
-        raw = raw * 256 + byte
-    return raw
+def bytes_to_int(data, length=None):
+    if length is not None and len(data) != length:
+        raise ValueError("Expected {} bytes, got {}".format(length, len(data)))
+    return int.from_bytes(data, "big")
+
+
+def ints_to_bytes(values, length):
+    # Packs several integers into one buffer, e.g. r || s or x || y
+    return b"".join(int_to_bytes(value, length) for value in values)
+
+
+def bytes_to_ints(data, length, count=None):
+    # Inverse of ints_to_bytes. If count is given, the buffer must contain
+    # exactly that many values
+    if len(data) % length != 0 or (count is not None and len(data) != length * count):
+        raise ValueError("Invalid buffer length {}".format(len(data)))
+    return [int.from_bytes(data[i:i + length], "big") for i in range(0, len(data), length)]
+
+
+def isqrt(n):
+    # Integer square root by Newton's method. math.isqrt needs Python 3.8
+    if n == 0:
+        return 0
+    x = 1 << ((n.bit_length() + 1) // 2)
+    while True:
+        y = (x + n // x) // 2
+        if y >= x:
+            return x
+        x = y
 
 
 def legendre(a, p):
@@ -21,55 +45,142 @@ def legendre(a, p):
         return res
 
 
-def inverse(a, n):
-    if a == 0:
-        return 0
-    lm, hm = 1, 0
-    low, high = a % n, n
-    while low > 1:
-        r = high // low
-        nm, new = hm - lm * r, high - low * r
-        lm, low, hm, high = nm, new, lm, low
-    return lm % n
+try:
+    pow(2, -1, 3)
+except ValueError:
+    # Python < 3.8, no native modular inversion
+    def inverse(a, n):
+        if a == 0:
+            return 0
+        lm, hm = 1, 0
+        low, high = a % n, n
+        while low > 1:
+            r = high // low
+            nm, new = hm - lm * r, high - low * r
+            lm, low, hm, high = nm, new, lm, low
+        return lm % n
+else:
+    # Native extended Euclid, about twice as fast
+    def inverse(a, n):
+        a %= n
+        if a == 0:
+            return 0
+        return pow(a, -1, n)
 
 
-def square_root_mod_prime(n, p):
-    if n == 0:
-        return 0
-    if legendre(n, p) != 1:
-        raise ValueError("No square root")
-    # Optimizations
+def batch_inverse(values, n):
+    # Montgomery's trick: one inversion and 3 * (k - 1) multiplications for k
+    # values. Zeroes are mapped to zeroes, just like in inverse()
+    if len(values) == 1:
+        return [inverse(values[0], n)]
+    values = [value % n for value in values]
+    prefix = []
+    acc = 1
+    for value in values:
+        prefix.append(acc)
+        if value:
+            acc = acc * value % n
+    acc = inverse(acc, n)
+    res = [0] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        if values[i]:
+            res[i] = acc * prefix[i] % n
+            acc = acc * values[i] % n
+    return res
+
+
+def square_root_function(p):
+    # Picks the square root algorithm for the prime p and precomputes all
+    # constants it needs. The result is checked by squaring, so no Legendre
+    # symbol is computed in advance
     if p % 4 == 3:
-        return pow(n, (p + 1) // 4, p)
-    # 1. By factoring out powers of 2, find Q and S such that p - 1 =
-    # Q * 2 ** S with Q odd
-    q = p - 1
-    s = 0
-    while q % 2 == 0:
-        q //= 2
-        s += 1
-    # 2. Search for z in Z/pZ which is a quadratic non-residue
-    z = 1
-    while legendre(z, p) != -1:
-        z += 1
-    m, c, t, r = s, pow(z, q, p), pow(n, q, p), pow(n, (q + 1) // 2, p)
-    while True:
-        if t == 0:
-            return 0
-        elif t == 1:
+        exponent = (p + 1) // 4
+        def root(n):
+            return pow(n, exponent, p)
+    elif p % 8 == 5:
+        # Atkin's algorithm
+        exponent = (p - 5) // 8
+        def root(n):
+            v = pow(2 * n, exponent, p)
+            i = 2 * n * v * v % p
+            return n * v * (i - 1) % p
+    else:
+        # Tonelli-Shanks. 1. By factoring out powers of 2, find Q and S such
+        # that p - 1 = Q * 2 ** S with Q odd
+        q = p - 1
+        s = 0
+        while q % 2 == 0:
+            q //= 2
+            s += 1
+        # 2. Search for z in Z/pZ which is a quadratic non-residue
+        z = 2
+        while legendre(z, p) != -1:
+            z += 1
+        # c is always z ** Q raised to some power of two
+        c_powers = [pow(z, q, p)]
+        for _ in range(s - 1):
+            c_powers.append(c_powers[-1] * c_powers[-1] % p)
+        exponent = (q - 1) // 2
+        def root(n):
+            # r = n ** ((Q + 1) / 2), t = n ** Q
+            r = pow(n, exponent, p)
+            t = r * r * n % p
+            r = r * n % p
+            m = s
+            while t != 1:
+                # Use repeated squaring to find the least i, 0 < i < M, such
+                # that t ** (2 ** i) = 1
+                t_sq = t
+                for i in range(1, m):
+                    t_sq = t_sq * t_sq % p
+                    if t_sq == 1:
+                        break
+                else:
+                    # Not a quadratic residue
+                    return None
+                # Let b = c ** (2 ** (m - i - 1))
+                b = c_powers[s - i - 1]
+                m = i
+                t = t * b * b % p
+                r = r * b % p
             return r
-        # Use repeated squaring to find the least i, 0 < i < M, such
-        # that t ** (2 ** i) = 1
-        t_sq = t
-        i = 0
-        for i in range(1, m):
-            t_sq = t_sq * t_sq % p
-            if t_sq == 1:
-                break
-        # Let b = c ** (2 ** (m - i - 1))
-        b = pow(c, 2 ** (m - i - 1), p)
-        m = i
-        c = b * b % p
-        t = t * b * b % p
-        r = r * b % p
-    return r
+
+    def square_root(n):
+        n %= p
+        if n == 0:
+            return 0
+        r = root(n)
+        if r is None or r * r % p != n:
+            raise ValueError("No square root")
+        return r
+    return square_root
+
+
+def mersenne_reducer(p):
+    # For p = 2 ** k - 1, reduction modulo p is a couple of shifts and
+    # additions, since 2 ** k = 1 (mod p). Returns None for other primes.
+    # Other special forms (2 ** k - c, NIST primes) take more steps than
+    # CPython's % does for the same sizes, so they are not handled here
+    if p & (p + 1):
+        return None
+    k = p.bit_length()
+    def reduce(x):
+        # Exact for |x| < 2 ** (2 * k + 32), e.g. small multiples of products
+        # of two reduced values
+        x = (x & p) + (x >> k)
+        x = (x & p) + (x >> k)
+        if x < 0:
+            x += p
+        elif x >= p:
+            x -= p
+        return x
+    return reduce
+
+
+_square_root_functions = {}
+
+
+def square_root_mod_prime(n, p):
+    if p not in _square_root_functions:
+        _square_root_functions[p] = square_root_function(p)
+    return _square_root_functions[p](n)
@@ -1,11 +1,108 @@
 import os
 import pyaes
+from pyaes.util import append_PKCS7_padding, strip_PKCS7_padding
 from .._aes import AES
+from .._lru import LRUCache
+from ._util import bytes_to_int
 
 
 __all__ = ["aes"]
 
+
+# How many expanded key schedules to keep. Expanding a key costs about as
+# much as encrypting a short message
+EXPANDED_KEYS_CACHE_SIZE = 64
+
+
+# pyaes modes of operation always expand the key in their constructors. These
+# subclasses take an already expanded pyaes.AES object instead, and set up the
+# same state as pyaes 1.6.1 does
+class _CBC(pyaes.AESModeOfOperationCBC):
+    def __init__(self, expanded_key, iv):
+        # pylint: disable=super-init-not-called
+        self._aes = expanded_key
+        self._last_cipherblock = bytes(iv)
+
+
+class _CTR(pyaes.AESModeOfOperationCTR):
+    def __init__(self, expanded_key, counter):
+        # pylint: disable=super-init-not-called
+        self._aes = expanded_key
+        self._counter = counter
+        self._remaining_counter = []
+
+
+class _CFB(pyaes.AESModeOfOperationCFB):
+    def __init__(self, expanded_key, iv, segment_size):
+        # pylint: disable=super-init-not-called
+        self._aes = expanded_key
+        self._shift_register = bytes(iv)
+        self._segment_bytes = segment_size
+
+
+class _OFB(pyaes.AESModeOfOperationOFB):
+    def __init__(self, expanded_key, iv):
+        # pylint: disable=super-init-not-called
+        self._aes = expanded_key
+        self._last_precipherblock = bytes(iv)
+        self._remaining_block = []
+
+
+class _Context:
+    # Incremental encryption or decryption. Only whole blocks are passed to
+    # pyaes, the rest is kept until the next update() or finalize()
+    def __init__(self, cipher_type, cipher, iv, decrypt):
+        self.iv = iv
+        self._cipher_type = cipher_type
+        self._process = cipher.decrypt if decrypt else cipher.encrypt
+        self._decrypt = decrypt
+        self._buffer = b""
+
+
+    def update(self, data):
+        if self._buffer is None:
+            raise ValueError("Context is already finalized")
+        if not data:
+            return b""
+        if self._cipher_type in ("ctr", "ofb"):
+            # Stream ciphers can process any amount of data
+            return self._process(bytes(data))
+
+        data = self._buffer + bytes(data)
+        end = len(data) - len(data) % 16
+        if self._decrypt and self._cipher_type == "cbc" and end == len(data):
+            # Keep the last block to strip padding from it
+            end -= 16
+        self._buffer = data[end:]
+        if end <= 0:
+            return b""
+        if self._cipher_type == "cfb":
+            return self._process(data[:end])
+        return b"".join([self._process(data[i:i + 16]) for i in range(0, end, 16)])
+
+
+    def finalize(self):
+        if self._buffer is None:
+            raise ValueError("Context is already finalized")
+        data, self._buffer = self._buffer, None
+        if self._cipher_type == "cbc":
+            if self._decrypt:
+                if len(data) != 16:
+                    raise ValueError("Invalid ciphertext length")
+                return strip_PKCS7_padding(self._process(data))
+            data = append_PKCS7_padding(data)
+            return b"".join([self._process(data[i:i + 16]) for i in range(0, len(data), 16)])
+        elif self._cipher_type == "cfb" and data:
+            # Pad the last segment with zeroes and throw the padding away
+            return self._process(data + b"\x00" * (16 - len(data)))[:len(data)]
+        return b""
+
+
 class AESBackend:
+    def __init__(self):
+        self._expanded_keys = LRUCache(EXPANDED_KEYS_CACHE_SIZE)
+
+
     def _get_algo_cipher_type(self, algo):
         if not algo.startswith("aes-") or algo.count("-") != 2:
             raise ValueError("Unknown cipher algorithm {}".format(algo))
@@ -29,14 +126,20 @@ class AESBackend:
         return os.urandom(length)
 
 
-    def encrypt(self, data, key, algo="aes-256-cbc"):
-        cipher_type = self._get_algo_cipher_type(algo)
+    def _get_expanded_key(self, key):
+        expanded_key = self._expanded_keys.get(key)
+        if expanded_key is None:
+            expanded_key = pyaes.AES(key)
+            self._expanded_keys.put(key, expanded_key)
+        return expanded_key
 
-        # Generate random IV
-        iv = os.urandom(16)
 
+    def _get_cipher(self, cipher_type, key, iv):
+        expanded_key = self._get_expanded_key(bytes(key))
+        if cipher_type != "ctr" and len(iv) != 16:
+            raise ValueError("initialization vector must be 16 bytes")
         if cipher_type == "cbc":
-            cipher = pyaes.AESModeOfOperationCBC(key, iv=iv)
+            return _CBC(expanded_key, iv)
         elif cipher_type == "ctr":
             # The IV is actually a counter, not an IV but it does almost the
             # same. Notice: pyaes always uses 1 as initial counter! Make sure
@@ -45,53 +148,40 @@ class AESBackend:
             # We kinda do two conversions here: from byte array to int here, and
             # from int to byte array in pyaes internals. It's possible to fix that
             # but I didn't notice any performance changes so I'm keeping clean code.
-            iv_int = 0
-            for byte in iv:
-                iv_int = (iv_int * 256) + byte
-            counter = pyaes.Counter(iv_int)
-            cipher = pyaes.AESModeOfOperationCTR(key, counter=counter)
+            counter = pyaes.Counter(bytes_to_int(iv))
+            return _CTR(expanded_key, counter)
         elif cipher_type == "cfb":
             # Change segment size from default 8 bytes to 16 bytes for OpenSSL
             # compatibility
-            cipher = pyaes.AESModeOfOperationCFB(key, iv, segment_size=16)
+            return _CFB(expanded_key, iv, segment_size=16)
         elif cipher_type == "ofb":
-            cipher = pyaes.AESModeOfOperationOFB(key, iv)
+            return _OFB(expanded_key, iv)
+        else:
+            raise ValueError("Unknown cipher mode {}".format(cipher_type))
 
-        encrypter = pyaes.Encrypter(cipher)
-        ciphertext = encrypter.feed(data)
-        ciphertext += encrypter.feed()
-        return ciphertext, iv
 
+    def encryptor(self, key, algo="aes-256-cbc"):
+        cipher_type = self._get_algo_cipher_type(algo)
 
-    def decrypt(self, ciphertext, iv, key, algo="aes-256-cbc"):
+        # Generate random IV
+        iv = os.urandom(16)
+
+        return _Context(cipher_type, self._get_cipher(cipher_type, key, iv), iv, decrypt=False)
+
+
+    def decryptor(self, iv, key, algo="aes-256-cbc"):
         cipher_type = self._get_algo_cipher_type(algo)
+        return _Context(cipher_type, self._get_cipher(cipher_type, key, iv), iv, decrypt=True)
 
-        if cipher_type == "cbc":
-            cipher = pyaes.AESModeOfOperationCBC(key, iv=iv)
-        elif cipher_type == "ctr":
-            # The IV is actually a counter, not an IV but it does almost the
-            # same. Notice: pyaes always uses 1 as initial counter! Make sure
-            # not to call pyaes directly.
 
-            # We kinda do two conversions here: from byte array to int here, and
-            # from int to byte array in pyaes internals. It's possible to fix that
-            # but I didn't notice any performance changes so I'm keeping clean code.
-            iv_int = 0
-            for byte in iv:
-                iv_int = (iv_int * 256) + byte
-            counter = pyaes.Counter(iv_int)
-            cipher = pyaes.AESModeOfOperationCTR(key, counter=counter)
-        elif cipher_type == "cfb":
-            # Change segment size from default 8 bytes to 16 bytes for OpenSSL
-            # compatibility
-            cipher = pyaes.AESModeOfOperationCFB(key, iv, segment_size=16)
-        elif cipher_type == "ofb":
-            cipher = pyaes.AESModeOfOperationOFB(key, iv)
+    def encrypt(self, data, key, algo="aes-256-cbc"):
+        encryptor = self.encryptor(key, algo)
+        return encryptor.update(data) + encryptor.finalize(), encryptor.iv
+
 
-        decrypter = pyaes.Decrypter(cipher)
-        data = decrypter.feed(ciphertext)
-        data += decrypter.feed()
-        return data
+    def decrypt(self, ciphertext, iv, key, algo="aes-256-cbc"):
+        decryptor = self.decryptor(iv, key, algo)
+        return decryptor.update(ciphertext) + decryptor.finalize()
 
 
     def get_backend(self):
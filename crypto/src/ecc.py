@@ -1,15 +1,35 @@
 import hmac
 import os
-from ._jacobian import JacobianCurve
+from ._jacobian import JacobianCurve, wnaf, WNAF_WINDOW, PIPPENGER_THRESHOLD
 from .._ecc import ECC
 from .aes import aes
-from ._util import int_to_bytes, bytes_to_int, inverse, square_root_mod_prime
+from ._util import int_to_bytes, bytes_to_int, ints_to_bytes, bytes_to_ints
+from ._util import inverse, batch_inverse, square_root_function
+
+
+# R multipliers in batch verification are only 128 bits long
+BATCH_R_WINDOW = 4
+
+
+class PreparedPoint:
+    # A validated public key and its multiples, built on first use
+    def __init__(self, jacobian, point):
+        self.point = point
+        self._jacobian = jacobian
+        self._table = None
+
+
+    def jacobian_multiply(self, n, secret=False):
+        if self._table is None:
+            self._table = self._jacobian.fixed_base_table(self._jacobian.to_jacobian(self.point))
+        return self._jacobian.jacobian_multiply_fixed_base(self._table, n, secret)
 
 
 class EllipticCurveBackend:
     def __init__(self, p, n, a, b, g):
         self.p, self.n, self.a, self.b, self.g = p, n, a, b, g
         self.jacobian = JacobianCurve(p, n, a, b, g)
+        self._square_root = square_root_function(p)
 
         self.public_key_length = (len(bin(p).replace("0b", "")) + 7) // 8
         self.order_bitlength = len(bin(n).replace("0b", ""))
@@ -25,7 +45,7 @@ class EllipticCurveBackend:
         # Calculate Y
         y_square = (pow(x, 3, self.p) + self.a * x + self.b) % self.p
         try:
-            y = square_root_mod_prime(y_square, self.p)
+            y = self._square_root(y_square)
         except Exception:
             raise ValueError("Invalid public key") from None
         if y % 2 != public_key[0] - 0x02:
@@ -33,28 +53,107 @@ class EllipticCurveBackend:
         return self._int_to_bytes(x), self._int_to_bytes(y)
 
 
+    def _random_scalars(self, count):
+        # Rejection sampling of 1 <= k < n. Bits above the order length are
+        # masked out, so at least half of the candidates are accepted and
+        # randomness can be requested in large blocks
+        mask = (1 << self.order_bitlength) - 1
+        res = []
+        while len(res) < count:
+            block = os.urandom((count - len(res)) * self.public_key_length)
+            for i in range(0, len(block), self.public_key_length):
+                k = bytes_to_int(block[i:i + self.public_key_length]) & mask
+                if 0 < k < self.n:
+                    res.append(k)
+        return res
+
+
     def new_private_key(self):
-        while True:
-            private_key = os.urandom(self.public_key_length)
-            if bytes_to_int(private_key) >= self.n:
-                continue
-            return private_key
+        return self._int_to_bytes(self._random_scalars(1)[0])
+
+
+    def generate_keypairs(self, count, wide_table=False):
+        private_keys = self._random_scalars(count)
+        if wide_table:
+            table = self.jacobian.get_wide_base_table()
+        else:
+            table = self.jacobian._get_base_table()
+        public_keys = self.jacobian.batch_from_jacobian([
+            self.jacobian.jacobian_multiply_fixed_base(table, k) for k in private_keys
+        ])
+        return [
+            (self._int_to_bytes(k), (self._int_to_bytes(x), self._int_to_bytes(y)))
+            for k, (x, y) in zip(private_keys, public_keys)
+        ]
 
 
     def private_to_public(self, private_key):
         raw = bytes_to_int(private_key)
-        x, y = self.jacobian.fast_multiply(self.g, raw)
+        x, y = self.jacobian.fast_multiply_base(raw)
         return self._int_to_bytes(x), self._int_to_bytes(y)
 
 
+    def iterate_public_keys(self, private_key, step, batch_size):
+        # Yields public keys of private_key + i * step for i = 0, 1, ... One
+        # addition per key, and one inversion per batch
+        point = self.jacobian.jacobian_multiply_base(bytes_to_int(private_key))
+        stride = self.jacobian.to_jacobian(self.jacobian.fast_multiply_base(step))
+        while True:
+            points = []
+            while len(points) < batch_size and not self.jacobian.isinf(point):
+                points.append(point)
+                point = self.jacobian.jacobian_add(point, stride)
+            # Keys before infinity are valid, so they are yielded first
+            for x, y in self.jacobian.batch_from_jacobian(points):
+                yield self._int_to_bytes(x), self._int_to_bytes(y)
+            if self.jacobian.isinf(point):
+                raise ValueError("Private key is out of range")
+
+
+    def _load_public_key(self, public_key):
+        if isinstance(public_key, PreparedPoint):
+            return public_key
+        public_key = tuple(bytes_to_int(c) for c in public_key)
+        # Ensure that the public key is correct
+        if not self.jacobian.is_valid_public_key(public_key):
+            raise ValueError("Public key is not on curve")
+        return public_key
+
+
+    def prepare_public_key(self, public_key):
+        return PreparedPoint(self.jacobian, self._load_public_key(public_key))
+
+
     def ecdh(self, private_key, public_key):
-        x, y = public_key
-        x, y = bytes_to_int(x), bytes_to_int(y)
+        public_key = self._load_public_key(public_key)
         private_key = bytes_to_int(private_key)
-        x, _ = self.jacobian.fast_multiply((x, y), private_key, secret=True)
+        if isinstance(public_key, PreparedPoint):
+            point = public_key.jacobian_multiply(private_key, secret=True)
+            x, _ = self.jacobian.from_jacobian(point)
+        else:
+            x, _ = self.jacobian.fast_multiply(public_key, private_key, secret=True)
         return self._int_to_bytes(x)
 
 
+    def multi_scalar_multiply(self, items):
+        # items are (public_key, scalar) pairs, where public_key is None for
+        # the generator. Returns None for the point at infinity
+        pairs = []
+        for public_key, scalar in items:
+            if public_key is None:
+                point = self.g
+            else:
+                point = self._load_public_key(public_key)
+                if isinstance(point, PreparedPoint):
+                    point = point.point
+            pairs.append((self.jacobian.to_jacobian(point), scalar))
+        res = self.jacobian.multi_scalar_multiply(pairs)
+        if self.jacobian.isinf(res):
+            return None
+        x, y = self.jacobian.from_jacobian(res)
+        return self._int_to_bytes(x), self._int_to_bytes(y)
+
+
     def _subject_to_int(self, subject):
         return bytes_to_int(subject[:(self.order_bitlength + 7) // 8])
 
@@ -75,7 +174,7 @@ class EllipticCurveBackend:
             k = kt
         else:
             k = ks
-        px, py = self.jacobian.fast_multiply(self.g, k, secret=True)
+        px, py = self.jacobian.fast_multiply_base(k, secret=True)
 
         r = px % self.n
         if r == 0:
@@ -91,7 +190,7 @@ class EllipticCurveBackend:
         if s * 2 >= self.n:
             s = self.n - s
             inverted = True
-        rs_buf = self._int_to_bytes(r) + self._int_to_bytes(s)
+        rs_buf = ints_to_bytes((r, s), self.public_key_length)
 
         if recoverable:
             recid = (py % 2) ^ inverted
@@ -106,12 +205,39 @@ class EllipticCurveBackend:
             return rs_buf
 
 
+    def _shamir(self, u1, public_key, u2):
+        if isinstance(public_key, PreparedPoint):
+            # Both multiplications are table lookups, no doublings at all
+            return self.jacobian.jacobian_add(
+                self.jacobian.jacobian_multiply_base(u1), public_key.jacobian_multiply(u2)
+            )
+        return self.jacobian.jacobian_shamir_base(u1, self.jacobian.to_jacobian(public_key), u2)
+
+
+    def _recover_r(self, r, recid):
+        rx = r + (recid // 2) * self.n
+        if rx >= self.p:
+            raise ValueError("Rx is out of bounds")
+
+        # Almost copied from decompress_point
+        ry_square = (pow(rx, 3, self.p) + self.a * rx + self.b) % self.p
+        try:
+            ry = self._square_root(ry_square)
+        except Exception:
+            raise ValueError("Invalid recovered public key") from None
+
+        # Ensure the point is correct
+        if ry % 2 != recid % 2:
+            # Fix Ry sign
+            ry = self.p - ry
+        return rx, ry
+
+
     def recover(self, signature, subject):
         z = self._subject_to_int(subject)
 
         recid = signature[0] - 27 if signature[0] < 31 else signature[0] - 31
-        r = bytes_to_int(signature[1:self.public_key_length + 1])
-        s = bytes_to_int(signature[self.public_key_length + 1:])
+        r, s = bytes_to_ints(signature[1:], self.public_key_length, 2)
 
         # Verify bounds
         if not 0 <= recid < 2 * (self.p // self.n + 1):
@@ -126,55 +252,164 @@ class EllipticCurveBackend:
         u2 = (s * rinv) % self.n
 
         # Recover R
-        rx = r + (recid // 2) * self.n
-        if rx >= self.p:
-            raise ValueError("Rx is out of bounds")
-
-        # Almost copied from decompress_point
-        ry_square = (pow(rx, 3, self.p) + self.a * rx + self.b) % self.p
-        try:
-            ry = square_root_mod_prime(ry_square, self.p)
-        except Exception:
-            raise ValueError("Invalid recovered public key") from None
-
-        # Ensure the point is correct
-        if ry % 2 != recid % 2:
-            # Fix Ry sign
-            ry = self.p - ry
-
+        rx, ry = self._recover_r(r, recid)
         x, y = self.jacobian.fast_shamir(self.g, u1, (rx, ry), u2)
         return self._int_to_bytes(x), self._int_to_bytes(y)
 
 
-    def verify(self, signature, subject, public_key):
+    def _parse_verify(self, signature, subject, public_key):
         z = self._subject_to_int(subject)
 
-        r = bytes_to_int(signature[:self.public_key_length])
-        s = bytes_to_int(signature[self.public_key_length:])
+        r, s = bytes_to_ints(signature, self.public_key_length, 2)
 
         # Verify bounds
-        if r >= self.n:
+        if not 0 < r < self.n:
             raise ValueError("r is out of bounds")
-        if s >= self.n:
+        if not 0 < s < self.n:
             raise ValueError("s is out of bounds")
 
-        public_key = [bytes_to_int(c) for c in public_key]
+        return z, r, s, self._load_public_key(public_key)
 
-        # Ensure that the public key is correct
-        if not self.jacobian.is_on_curve(public_key):
-            raise ValueError("Public key is not on curve")
+
+    def verify(self, signature, subject, public_key):
+        z, r, s, public_key = self._parse_verify(signature, subject, public_key)
 
         sinv = inverse(s, self.n)
         u1 = (z * sinv) % self.n
         u2 = (r * sinv) % self.n
 
-        x1, _ = self.jacobian.fast_shamir(self.g, u1, public_key, u2)
+        x1, _ = self.jacobian.from_jacobian(self._shamir(u1, public_key, u2))
         if r != x1 % self.n:
             raise ValueError("Invalid signature")
 
         return True
 
 
+    def verify_batch(self, items):
+        # Items are (signature, subject, public_key) triples, or None for
+        # signatures the caller has already rejected. Signatures may have a
+        # recovery ID prepended. Only those are combined into one check:
+        # without the recovery ID, the sign of R's y is unknown, so plain
+        # signatures merely share tables and the affine conversion and are
+        # about as fast as separate verify calls
+        parsed = []
+        for item in items:
+            try:
+                signature, subject, public_key = item
+                recid = None
+                if len(signature) == 1 + 2 * self.public_key_length:
+                    recid = signature[0] - 27 if signature[0] < 31 else signature[0] - 31
+                    signature = signature[1:]
+                parsed.append(self._parse_verify(signature, subject, public_key) + (recid,))
+            except (TypeError, ValueError):
+                parsed.append(None)
+        valid = [item for item in parsed if item is not None]
+
+        # One inversion for all s
+        sinvs = batch_inverse([s for _, _, s, _, _ in valid], self.n)
+        entries = []
+        prepared = {}
+        for (z, r, _, public_key, recid), sinv in zip(valid, sinvs):
+            if isinstance(public_key, PreparedPoint):
+                prepared[len(entries)] = public_key
+                public_key = public_key.point
+            entries.append(((z * sinv) % self.n, (r * sinv) % self.n, r, public_key, recid))
+
+        # Precomputed tables are shared by all equations, and built on first
+        # use
+        public_key_tables = {}
+
+        # When R is known, i.e. the recovery ID is available, all equations
+        # u1 * G + u2 * Q = R are checked at once as a random linear
+        # combination. This only works for prime-order groups
+        results = {}
+        if self.jacobian.cofactor == 1:
+            known_r = []
+            for i, (_, _, r, _, recid) in enumerate(entries):
+                if recid is not None and 0 <= recid < 2 * (self.p // self.n + 1):
+                    try:
+                        rx, ry = self._recover_r(r, recid)
+                    except ValueError:
+                        continue
+                    known_r.append((i, (rx, ry, 1)))
+            self._verify_combinations(entries, known_r, public_key_tables, results)
+
+        # The rest are verified one by one
+        points = []
+        for i, (u1, u2, _, public_key, _) in enumerate(entries):
+            if i in prepared and i not in results:
+                points.append(self._shamir(u1, prepared[i], u2))
+            elif i not in results:
+                tables = self._public_key_tables(public_key_tables, public_key)
+                points.append(self.jacobian.jacobian_interleave(
+                    self.jacobian.base_wnaf_terms(u1) +
+                    self.jacobian.wnaf_terms(u2, WNAF_WINDOW, *tables)
+                ))
+
+        # One inversion for all Jacobian-to-affine conversions
+        affine = iter(self.jacobian.batch_from_jacobian(points))
+        for i, (_, _, r, _, _) in enumerate(entries):
+            if i not in results:
+                x1, _ = next(affine)
+                results[i] = r == x1 % self.n
+
+        entries = iter(range(len(entries)))
+        return [False if item is None else results[next(entries)] for item in parsed]
+
+
+    def _verify_combinations(self, entries, known_r, public_key_tables, results):
+        # Bisect on failure so that a few invalid signatures don't make the
+        # whole batch fall back to slow verification
+        if len(known_r) < 2:
+            return
+        if self._verify_combination(entries, known_r, public_key_tables):
+            for i, _ in known_r:
+                results[i] = True
+        elif len(known_r) > 4:
+            half = len(known_r) // 2
+            self._verify_combinations(entries, known_r[:half], public_key_tables, results)
+            self._verify_combinations(entries, known_r[half:], public_key_tables, results)
+
+
+    def _public_key_tables(self, cache, public_key):
+        if public_key not in cache:
+            tables = self.jacobian.wnaf_table(self.jacobian.to_jacobian(public_key), WNAF_WINDOW)
+            glv_tables = self.jacobian.glv_table(tables) if self.jacobian._glv else None
+            cache[public_key] = tables, glv_tables
+        return cache[public_key]
+
+
+    def _verify_combination(self, entries, known_r, public_key_tables):
+        # sum(a_i * (u1_i * G + u2_i * Q_i - R_i)) = 0 for random 128-bit a_i
+        g_scalar = 0
+        public_key_scalars = {}
+        r_scalars = []
+        for i, r_point in known_r:
+            u1, u2, _, public_key, _ = entries[i]
+            a = bytes_to_int(os.urandom(16)) | 1
+            g_scalar += a * u1
+            public_key_scalars[public_key] = public_key_scalars.get(public_key, 0) + a * u2
+            r_scalars.append((self.jacobian.jacobian_negate(r_point), a))
+
+        if len(known_r) >= PIPPENGER_THRESHOLD:
+            pairs = [(self.jacobian.to_jacobian(self.g), g_scalar)] + r_scalars
+            for public_key, scalar in public_key_scalars.items():
+                pairs.append((self.jacobian.to_jacobian(public_key), scalar))
+            return self.jacobian.isinf(self.jacobian.multi_scalar_multiply(pairs))
+
+        # Same as multi_scalar_multiply, but public key tables are reused by
+        # bisection and single verification
+        terms = []
+        for r_point, a in r_scalars:
+            table, neg_table = self.jacobian.wnaf_table(r_point, BATCH_R_WINDOW)
+            terms.append((wnaf(a, BATCH_R_WINDOW), table, neg_table))
+        terms += self.jacobian.base_wnaf_terms(g_scalar % self.n)
+        for public_key, scalar in public_key_scalars.items():
+            tables = self._public_key_tables(public_key_tables, public_key)
+            terms += self.jacobian.wnaf_terms(scalar % self.n, WNAF_WINDOW, *tables)
+        return self.jacobian.isinf(self.jacobian.jacobian_interleave(terms))
+
+
     def derive_child(self, seed, child):
         # Round 1
         h = hmac.new(key=b"Bitcoin seed", msg=seed, digestmod="sha512").digest()
@@ -1,3 +1,4 @@
+import io
 import pytest
 import sslcrypto
 import sslcrypto.fallback
@@ -25,3 +26,46 @@ def test(aes, key_length, cipher_type):
     with pytest.raises(ValueError):
         if aes.decrypt(*aes.encrypt(data, key1, algo=algo), key=key2, algo=algo) != data:
             raise ValueError("Got wrong data")
+
+
+# NIST SP 800-38A, first block of the AES-128 examples
+@pytest.mark.parametrize("cipher_type,iv,ciphertext", [
+    ("ctr", "f0f1f2f3f4f5f6f7f8f9fafbfcfdfeff", "874d6191b620e3261bef6864990db6ce"),
+    ("cfb", "000102030405060708090a0b0c0d0e0f", "3b3fd92eb72dad20333449f8e83cfb4a"),
+    ("ofb", "000102030405060708090a0b0c0d0e0f", "3b3fd92eb72dad20333449f8e83cfb4a")
+])
+@pytest.mark.parametrize("aes", testcases, ids=["fallback-aes", "native-aes"][:len(testcases)])
+def test_vectors(aes, cipher_type, iv, ciphertext):
+    key = bytes.fromhex("2b7e151628aed2a6abf7158809cf4f3c")
+    plaintext = bytes.fromhex("6bc1bee22e409f96e93d7e117393172a")
+    algo = "aes-128-{}".format(cipher_type)
+    # Twice, so that a cached key schedule is used as well
+    for _ in range(2):
+        assert aes.decrypt(bytes.fromhex(ciphertext), bytes.fromhex(iv), key, algo=algo) == plaintext
+
+
+@pytest.mark.parametrize("cipher_type", ["cbc", "ctr", "cfb", "ofb"])
+@pytest.mark.parametrize("aes", testcases, ids=["fallback-aes", "native-aes"][:len(testcases)])
+def test_stream(aes, cipher_type):
+    algo = "aes-128-{}".format(cipher_type)
+    key = aes.new_key(algo=algo)
+
+    for length in (0, 1, 15, 16, 17, 100):
+        data = bytes(range(length))
+
+        encryptor = aes.encryptor(key, algo=algo)
+        ciphertext = b"".join(encryptor.update(data[i:i + 7]) for i in range(0, length, 7))
+        ciphertext += encryptor.finalize()
+        assert aes.decrypt(ciphertext, encryptor.iv, key, algo=algo) == data
+        with pytest.raises(ValueError):
+            encryptor.update(b"More data")
+
+        decryptor = aes.decryptor(encryptor.iv, key, algo=algo)
+        plaintext = b"".join(decryptor.update(ciphertext[i:i + 5]) for i in range(0, len(ciphertext), 5))
+        assert plaintext + decryptor.finalize() == data
+
+        ciphertext_stream = io.BytesIO()
+        iv = aes.encrypt_stream(io.BytesIO(data), ciphertext_stream, key, algo=algo, chunk_size=11)
+        plaintext_stream = io.BytesIO()
+        aes.decrypt_stream(io.BytesIO(ciphertext_stream.getvalue()), plaintext_stream, iv, key, algo=algo, chunk_size=3)
+        assert plaintext_stream.getvalue() == data
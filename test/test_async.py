@@ -0,0 +1,126 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+import sslcrypto
+import sslcrypto.fallback
+
+
+curve = sslcrypto.fallback.ecc.get_curve("secp256k1")
+aes = sslcrypto.fallback.aes
+
+
+def test_async():
+    private_key = curve.new_private_key()
+    public_key = curve.private_to_public(private_key)
+    data = b"Hello, world!"
+
+    async def run():
+        signature = await curve.asign(data, private_key, recoverable=True)
+        assert signature == curve.sign(data, private_key, recoverable=True)
+        assert await curve.averify(signature, data, public_key)
+        with pytest.raises(ValueError):
+            await curve.averify(signature, b"Wrong", public_key)
+        assert await curve.arecover(signature, data) == public_key
+        assert await curve.aderive(private_key, public_key) == curve.derive(private_key, public_key)
+
+        ciphertext = await curve.aencrypt(data, public_key)
+        assert await curve.adecrypt(ciphertext, private_key) == data
+
+        key = aes.new_key()
+        ciphertext, iv = await aes.aencrypt(data, key)
+        assert await aes.adecrypt(ciphertext, iv, key) == data
+
+    asyncio.run(run())
+
+
+def test_verify_coalescing(monkeypatch):
+    private_key = curve.new_private_key()
+    public_key = curve.private_to_public(private_key)
+    signatures = [curve.sign(b"%d" % i, private_key) for i in range(10)]
+
+    batches = []
+    verify_batch = curve.verify_batch
+    def counting_verify_batch(items, hash="sha256"):
+        batches.append(len(items))
+        return verify_batch(items, hash=hash)
+    monkeypatch.setattr(curve, "verify_batch", counting_verify_batch)
+
+    async def verify(i, signature):
+        try:
+            return await curve.averify(signature, b"%d" % i, public_key)
+        except ValueError:
+            return False
+
+    async def run():
+        return await asyncio.gather(*[verify(i % 9, signature) for i, signature in enumerate(signatures)])
+
+    assert asyncio.run(run()) == [True] * 9 + [False]
+    assert batches == [10]
+
+
+def test_process_executor():
+    private_key = curve.new_private_key()
+    public_key = curve.private_to_public(private_key)
+    key = aes.new_key()
+
+    async def run():
+        signature = await curve.asign(b"Hello", private_key)
+        assert await curve.averify(signature, b"Hello", curve.prepare_public_key(public_key))
+        ciphertext, iv = await aes.aencrypt(b"Hello", key)
+        assert aes.decrypt(ciphertext, iv, key) == b"Hello"
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        sslcrypto.configure_async(executor=executor, max_pending=4)
+        try:
+            asyncio.run(run())
+        finally:
+            sslcrypto.configure_async()
+
+
+def test_verify_malformed(monkeypatch):
+    private_key = curve.new_private_key()
+    public_key = curve.private_to_public(private_key)
+    signatures = [curve.sign(b"%d" % i, private_key) for i in range(4)]
+
+    verify_batch = curve.verify_batch
+    def failing_verify_batch(items, hash="sha256"):
+        if any(data == b"Poison" for _, data, _ in items):
+            raise RuntimeError("Poison")
+        return verify_batch(items, hash=hash)
+    monkeypatch.setattr(curve, "verify_batch", failing_verify_batch)
+
+    async def verify(signature, data, public_key):
+        try:
+            return await curve.averify(signature, data, public_key)
+        except ValueError:
+            return "ValueError"
+        except RuntimeError:
+            return "RuntimeError"
+
+    async def run():
+        requests = [verify(signature, b"%d" % i, public_key) for i, signature in enumerate(signatures)]
+        requests.insert(1, verify(signatures[0], "0", public_key))
+        requests.insert(3, verify(signatures[0], b"0", None))
+        requests.append(verify(signatures[0], b"Poison", public_key))
+        return await asyncio.gather(*requests)
+
+    assert asyncio.run(run()) == [True, "ValueError", True, "ValueError", True, True, "RuntimeError"]
+
+
+def test_prepared_table():
+    private_key = curve.new_private_key()
+    public_key = curve.private_to_public(private_key)
+    signature = curve.sign(b"Hello", private_key)
+
+    async def run():
+        prepared = curve.prepare_public_key(public_key)
+        assert await curve.aderive(curve.new_private_key(), prepared)
+        assert prepared._prepared._table is not None
+        prepared = curve.prepare_public_key(public_key)
+        assert await curve.aencrypt(b"Hello", prepared)
+        assert prepared._prepared._table is not None
+        prepared = curve.prepare_public_key(public_key)
+        assert await curve.averify(signature, b"Hello", prepared)
+        assert prepared._prepared._table is not None
+
+    asyncio.run(run())
@@ -1,3 +1,4 @@
+import os
 import pytest
 import sslcrypto
 import sslcrypto.fallback
@@ -79,6 +80,81 @@ def test(curve):
             curve.verify(signature, data2, pub1_compressed, hash=hash)
 
 
+@pytest.mark.parametrize("curve", curves, ids=curve_ids)
+def test_generate_keypairs(curve):
+    for is_compressed in (False, True):
+        pairs = list(curve.generate_keypairs(5, is_compressed=is_compressed))
+        assert len(pairs) == 5
+        for priv, pub in pairs:
+            assert 0 < int.from_bytes(priv[:len(priv) - is_compressed], "big") < curve.params["n"]
+            assert curve.private_to_public(priv) == pub
+        assert len(set(pairs)) == 5
+
+
+def test_random_scalars_reject_zero(monkeypatch):
+    backend = sslcrypto.fallback.ecc.get_curve("secp256k1")._backend
+    blocks = [b"\x00" * 64, b"\x00" * 32 + b"\x01" * 32, b"\x02" * 32]
+    monkeypatch.setattr(os, "urandom", lambda size: blocks.pop(0)[:size])
+    assert backend._random_scalars(2) == [int.from_bytes(b"\x01" * 32, "big"), int.from_bytes(b"\x02" * 32, "big")]
+
+
+def test_generate_keypairs_wide_table():
+    backend = sslcrypto.fallback.ecc.get_curve("secp112r1")._backend
+    for priv, pub in backend.generate_keypairs(20, wide_table=True):
+        assert backend.private_to_public(priv) == pub
+
+
+@pytest.mark.parametrize("curve", curves, ids=curve_ids)
+def test_iterate_public_keys(curve):
+    length = len(curve.new_private_key())
+    start = int.from_bytes(curve.new_private_key(), "big")
+    for step in (1, 7, -3):
+        for suffix in (b"", b"\x01"):
+            private_key = start.to_bytes(length, "big") + suffix
+            public_keys = list(curve.iterate_public_keys(private_key, step=step, count=5))
+            assert len(public_keys) == 5
+            for i, public_key in enumerate(public_keys):
+                expected = ((start + i * step) % curve._backend.n).to_bytes(length, "big") + suffix
+                assert public_key == curve.private_to_public(expected)
+
+    # Indefinite iteration
+    public_keys = curve.iterate_public_keys(curve.new_private_key())
+    assert len({next(public_keys) for _ in range(300)}) == 300
+
+    # Keys before n are yielded before the walk fails at infinity. On some
+    # curves n is longer than private keys
+    n = curve._backend.n
+    if n.bit_length() <= length * 8:
+        public_keys = curve.iterate_public_keys((n - 3).to_bytes(length, "big"), count=5)
+        for i in range(3):
+            assert next(public_keys) == curve.private_to_public((n - 3 + i).to_bytes(length, "big"))
+        with pytest.raises(ValueError):
+            next(public_keys)
+
+
+@pytest.mark.parametrize("curve", curves, ids=curve_ids)
+def test_multi_scalar_multiply(curve):
+    n = curve.params["n"]
+    priv1, priv2 = curve.new_private_key(), curve.new_private_key()
+    k1, k2 = int.from_bytes(priv1, "big"), int.from_bytes(priv2, "big")
+    pub1, pub2 = curve.private_to_public(priv1), curve.private_to_public(priv2)
+
+    def pub(k):
+        return curve.private_to_public((k % n).to_bytes(len(priv1), "big"))
+
+    assert curve.multi_scalar_multiply([]) is None
+    assert curve.multi_scalar_multiply([(None, 5)]) == pub(5)
+    assert curve.multi_scalar_multiply([(pub1, 3), (pub2, -1)]) == pub(3 * k1 - k2)
+    assert curve.multi_scalar_multiply([(None, 7), (pub1, 2), (None, 1)]) == pub(8 + 2 * k1)
+    assert curve.multi_scalar_multiply([(None, k1), (pub1, -1)]) is None
+    assert curve.multi_scalar_multiply([(curve.prepare_public_key(pub1), 1)], is_compressed=True) == curve.private_to_public(priv1 + b"\x01")
+
+    # Schnorr-style check: s * G = R + e * P
+    r, e = int.from_bytes(curve.new_private_key(), "big"), 12345
+    s = (r + e * k1) % n
+    assert curve.multi_scalar_multiply([(None, s), (pub(r), -1), (pub1, -e)]) is None
+
+
 @pytest.mark.parametrize("ecc", eccs, ids=ecc_ids)
 def test_static(ecc):
     curve = ecc.get_curve("secp256k1")
@@ -0,0 +1,23 @@
+import json
+import sslcrypto.bench
+
+
+def test_bench(capsys):
+    sslcrypto.bench.main([
+        "--curve", "secp112r1", "--algo", "aes-128-cbc", "--size", "16",
+        "--suite", "ecc", "--suite", "aes", "--suite", "ripemd160",
+        "--min-time", "0", "--json", "-"
+    ])
+    results = json.loads(capsys.readouterr().out)
+    fallback = results["backends"]["fallback"]
+    assert set(fallback["ecc"]["secp112r1"]) == set(sslcrypto.bench.ECC_OPERATIONS)
+    assert set(fallback["aes"]["aes-128-cbc"]["16"]) == {"encrypt", "decrypt"}
+    assert "16" in results["ripemd160"]["fallback"]
+
+
+def test_report(capsys):
+    sslcrypto.bench.main([
+        "--curve", "secp112r1", "--operation", "verify", "--operation", "verify_batch",
+        "--suite", "ecc", "--min-time", "0"
+    ])
+    assert "secp112r1        verify_batch " in capsys.readouterr().out
@@ -30,7 +30,129 @@ for name in curve_tests:
         def test():
             for k, x, y in curve_tests[name]:
                 assert jacobian.fast_multiply(jacobian.g, k) == (x, y)
+                assert jacobian.fast_multiply_base(k, secret=True) == (x, y)
+                g = jacobian.to_jacobian(jacobian.g)
+                assert jacobian.from_jacobian(jacobian.jacobian_multiply(g, k)) == (x, y)
+                assert jacobian.from_jacobian(jacobian.jacobian_multiply(g, k, secret=True)) == (x, y)
+                for window in (2, 3, 6):
+                    assert jacobian.from_jacobian(jacobian.jacobian_multiply(g, k, window=window)) == (x, y)
+                assert jacobian.fast_shamir(jacobian.g, k - 1, jacobian.g, 1) == (x, y)
 
         globals()["test_{}".format(name)] = test
 
     _gen(name)
+
+
+def test_glv():
+    for name in sslcrypto.fallback.ecc.CURVES:
+        jacobian = sslcrypto.fallback.ecc.get_curve(name)._backend.jacobian
+        assert (jacobian._glv is not None) == name.endswith("k1")
+        if jacobian._glv is None:
+            continue
+        _, lam, _, length = jacobian._glv
+
+        # The same curve with plain multiplication
+        plain = type(jacobian)(jacobian.p, jacobian.n, jacobian.a, jacobian.b, jacobian.g)
+        plain._glv = None
+
+        g = jacobian.to_jacobian(jacobian.g)
+        assert jacobian.from_jacobian(jacobian.jacobian_endomorphism(g)) == plain.fast_multiply(jacobian.g, lam)
+
+        q = plain.fast_multiply(jacobian.g, int.from_bytes(os.urandom(32), "big"))
+        for k in [1, 2, 3, lam, jacobian.n - 1, jacobian.n + 5] + [int.from_bytes(os.urandom(32), "big") for _ in range(10)]:
+            k1, k2 = jacobian.glv_split(k % jacobian.n)
+            assert (k1 + k2 * lam - k) % jacobian.n == 0
+            assert abs(k1).bit_length() <= length and abs(k2).bit_length() <= length
+            expected = plain.fast_multiply(q, k)
+            assert jacobian.fast_multiply(q, k) == expected
+            assert jacobian.fast_multiply(q, k, secret=True) == expected
+            assert jacobian.fast_shamir(jacobian.g, k, q, k + 1) == plain.fast_shamir(jacobian.g, k, q, k + 1)
+            assert jacobian.fast_shamir(q, k, q, 7) == plain.fast_shamir(q, k, q, 7)
+
+
+def _generic_double(jacobian, p):
+    # Point formulas for arbitrary a and z, as used before per-curve selection
+    if not p[1]:
+        return 0, 0, 0
+    ysq = (p[1] ** 2) % jacobian.p
+    s = (4 * p[0] * ysq) % jacobian.p
+    m = (3 * p[0] ** 2 + jacobian.a * p[2] ** 4) % jacobian.p
+    nx = (m ** 2 - 2 * s) % jacobian.p
+    ny = (m * (s - nx) - 8 * ysq ** 2) % jacobian.p
+    nz = (2 * p[1] * p[2]) % jacobian.p
+    return nx, ny, nz
+
+
+def _generic_add(jacobian, p, q):
+    if not p[1]:
+        return q
+    if not q[1]:
+        return p
+    u1 = (p[0] * q[2] ** 2) % jacobian.p
+    u2 = (q[0] * p[2] ** 2) % jacobian.p
+    s1 = (p[1] * q[2] ** 3) % jacobian.p
+    s2 = (q[1] * p[2] ** 3) % jacobian.p
+    if u1 == u2:
+        if s1 != s2:
+            return (0, 0, 1)
+        return _generic_double(jacobian, p)
+    h = u2 - u1
+    r = s2 - s1
+    h2 = (h * h) % jacobian.p
+    h3 = (h * h2) % jacobian.p
+    u1h2 = (u1 * h2) % jacobian.p
+    nx = (r ** 2 - h3 - 2 * u1h2) % jacobian.p
+    ny = (r * (u1h2 - nx) - s1 * h3) % jacobian.p
+    nz = (h * p[2] * q[2]) % jacobian.p
+    return (nx, ny, nz)
+
+
+@pytest.mark.parametrize("name", list(sslcrypto.fallback.ecc.CURVES))
+def test_point_formulas(name):
+    jacobian = sslcrypto.fallback.ecc.get_curve(name)._backend.jacobian
+    # Specialized doubling is chosen for a = 0 and a = -3
+    assert ("jacobian_double" in vars(jacobian)) == (jacobian.a in (0, jacobian.p - 3))
+
+    def affine(p):
+        return (0, 0) if jacobian.isinf(p) else jacobian.from_jacobian(p)
+
+    def rescale(p):
+        # The same point with a random z
+        z = int.from_bytes(os.urandom(80), "big") % (jacobian.p - 1) + 1
+        return p[0] * z ** 2 % jacobian.p, p[1] * z ** 3 % jacobian.p, p[2] * z % jacobian.p
+
+    points = []
+    for _ in range(4):
+        point = jacobian.to_jacobian(jacobian.fast_multiply_base(int.from_bytes(os.urandom(80), "big")))
+        points += [point, rescale(point), jacobian.jacobian_negate(rescale(point))]
+    points += [(0, 0, 1), (0, 0, 0)]
+
+    for p in points:
+        assert affine(jacobian.jacobian_double(p)) == affine(_generic_double(jacobian, p))
+        for q in points:
+            assert affine(jacobian.jacobian_add(p, q)) == affine(_generic_add(jacobian, p, q))
+
+
+@pytest.mark.parametrize("name", ["secp256k1", "prime256v1", "secp112r2"])
+def test_multi_scalar_multiply(name):
+    jacobian = sslcrypto.fallback.ecc.get_curve(name)._backend.jacobian
+    g = jacobian.to_jacobian(jacobian.g)
+
+    def random_scalar():
+        return int.from_bytes(os.urandom(40), "big") % jacobian.n
+
+    points = [jacobian.jacobian_multiply_base(random_scalar()) for _ in range(80)]
+    # Also a point with z = 1, a duplicate and infinity
+    points += [g, jacobian.normalize(points[:1])[0], (0, 0, 1)]
+    for count in [0, 1, 2, 3, len(points)]:
+        pairs = [(point, random_scalar() - jacobian.n // 2) for point in points[-count:]] if count else []
+        res = jacobian.multi_scalar_multiply(pairs)
+        expected = (0, 0, 1)
+        for point, k in pairs:
+            expected = jacobian.jacobian_add(expected, jacobian.jacobian_multiply(point, k))
+        assert jacobian.isinf(res) == jacobian.isinf(expected)
+        if not jacobian.isinf(res):
+            assert jacobian.from_jacobian(res) == jacobian.from_jacobian(expected)
+    # Short scalars and cancellation
+    assert jacobian.isinf(jacobian.multi_scalar_multiply([(points[0], 3), (points[0], -3)]))
+    assert jacobian.from_jacobian(jacobian.multi_scalar_multiply([(g, 2), (g, 1)])) == jacobian.fast_multiply_base(3)
@@ -0,0 +1,124 @@
+import os
+import pytest
+import sslcrypto
+import sslcrypto.fallback
+from sslcrypto.fallback._util import bytes_to_int, square_root_mod_prime
+
+
+curves, curve_ids = [], []
+for name in sslcrypto.ecc.CURVES:
+    curves.append(sslcrypto.fallback.ecc.get_curve(name))
+    curve_ids.append("fallback-{}".format(name))
+
+
+def random_point(jacobian):
+    while True:
+        x = bytes_to_int(os.urandom(len(bin(jacobian.p)))) % jacobian.p
+        try:
+            y = square_root_mod_prime((pow(x, 3, jacobian.p) + jacobian.a * x + jacobian.b) % jacobian.p, jacobian.p)
+        except ValueError:
+            continue
+        return x, y
+
+
+@pytest.mark.parametrize("curve", curves, ids=curve_ids)
+def test(curve):
+    jacobian = curve._backend.jacobian
+    assert jacobian.is_valid_public_key(jacobian.g)
+    assert not jacobian.is_on_curve((jacobian.g[0], jacobian.g[1] + 1))
+    assert not jacobian.is_on_curve((jacobian.g[0] + jacobian.p, jacobian.g[1]))
+    assert not jacobian.is_valid_public_key((0, 0))
+
+    for _ in range(16):
+        point = random_point(jacobian)
+        # Compute n * P without reducing n modulo the order
+        res = jacobian.jacobian_add(jacobian.jacobian_multiply(jacobian.to_jacobian(point), jacobian.n - 1), jacobian.to_jacobian(point))
+        assert jacobian.is_on_curve(point) == jacobian.isinf(res)
+        if jacobian.cofactor == 1:
+            assert jacobian.is_on_curve(point)
+
+
+@pytest.mark.parametrize("name, x", [
+    ("secp112r2", 3610075134545239076002374364665933),
+    ("secp128r2", 311198077076599516590082177721943503641)
+])
+def test_order_two_point(name, x):
+    # y = 0 on curves with cofactor 4. Such a point must not be mistaken for
+    # infinity
+    jacobian = sslcrypto.fallback.ecc.get_curve(name)._backend.jacobian
+    point = (x, 0)
+    assert (pow(x, 3, jacobian.p) + jacobian.a * x + jacobian.b) % jacobian.p == 0
+    assert not jacobian.isinf(point)
+    assert not jacobian.is_on_curve(point)
+    assert not jacobian.is_valid_public_key(point)
+    q = jacobian.to_jacobian(point)
+    assert jacobian.isinf(jacobian.jacobian_double(q))
+    assert jacobian.from_jacobian(jacobian.jacobian_add(q, jacobian.to_jacobian(jacobian.g))) == jacobian.from_jacobian(jacobian.jacobian_add(jacobian.to_jacobian(jacobian.g), q))
+    assert jacobian.isinf(jacobian.jacobian_add(q, q))
+    assert jacobian.from_jacobian(jacobian.jacobian_multiply(q, 3)) == point
+
+
+def test_public_key_cache():
+    curve = sslcrypto.fallback.ecc.get_curve("secp256k1")
+    maxsize = curve.public_key_cache_info()["maxsize"]
+    curve.set_public_key_cache_size(2)
+    priv = curve.new_private_key()
+    pubs = [curve.private_to_public(curve.new_private_key() + b"\x01") for _ in range(3)]
+    signature = curve.sign(b"Hello, world!", priv)
+    pub = curve.private_to_public(priv + b"\x01")
+
+    info = curve.public_key_cache_info()
+    for _ in range(3):
+        assert curve.verify(signature, b"Hello, world!", pub)
+    assert curve.public_key_cache_info()["hits"] == info["hits"] + 2
+    assert curve.public_key_cache_info()["misses"] == info["misses"] + 1
+
+    # Old keys are evicted
+    for other_pub in pubs:
+        curve.derive(priv, other_pub)
+    assert curve.public_key_cache_info()["size"] == 2
+    assert curve.verify(signature, b"Hello, world!", pub)
+    assert curve.public_key_cache_info()["misses"] == info["misses"] + 5
+
+    curve.set_public_key_cache_size(0)
+    assert curve.verify(signature, b"Hello, world!", pub)
+    assert curve.public_key_cache_info()["size"] == 0
+    curve.set_public_key_cache_size(maxsize)
+
+
+def test_public_key_type():
+    curve = sslcrypto.fallback.ecc.get_curve("secp256k1")
+    priv = curve.new_private_key()
+    pub = curve.private_to_public(priv)
+    shared = curve.derive(priv, pub)
+    assert curve.derive(priv, bytearray(pub)) == curve.derive(priv, memoryview(pub)) == shared
+    size = curve.public_key_cache_info()["size"]
+    for public_key in (len(pub), "04" * len(pub), None):
+        with pytest.raises(TypeError):
+            curve.derive(priv, public_key)
+    assert curve.public_key_cache_info()["size"] == size
+
+
+@pytest.mark.parametrize("curve", curves, ids=curve_ids)
+def test_prepared_public_key(curve):
+    priv1 = curve.new_private_key(is_compressed=True)
+    priv2 = curve.new_private_key()
+    pub1 = curve.private_to_public(priv1)
+    prepared = curve.prepare_public_key(pub1)
+    assert curve.prepare_public_key(prepared) is prepared
+    assert (prepared.x, prepared.y) == curve.decode_public_key(pub1)
+
+    data = b"Hello, world!"
+    signature = curve.sign(data, priv1)
+    assert curve.verify(signature, data, prepared)
+    with pytest.raises(ValueError):
+        curve.verify(signature, b"Wrong data", prepared)
+    assert curve.verify_batch([(signature, data, prepared), (signature, b"Wrong data", prepared)]) == [True, False]
+
+    assert curve.derive(priv2, prepared) == curve.derive(priv2, pub1) == curve.derive(priv1, curve.private_to_public(priv2))
+    assert curve.decrypt(curve.encrypt(data, prepared), priv1) == data
+
+    other_name = "secp256k1" if curve.nid != sslcrypto.ecc.CURVES["secp256k1"][0] else "secp384r1"
+    other_curve = sslcrypto.fallback.ecc.get_curve(other_name)
+    with pytest.raises(ValueError):
+        other_curve.derive(other_curve.new_private_key(), prepared)
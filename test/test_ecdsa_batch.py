@@ -0,0 +1,85 @@
+import pytest
+import sslcrypto
+import sslcrypto.fallback
+from sslcrypto import instrument
+
+
+curves, curve_ids = [], []
+for name in sslcrypto.ecc.CURVES:
+    curves.append(sslcrypto.fallback.ecc.get_curve(name))
+    curve_ids.append("fallback-{}".format(name))
+
+
+@pytest.mark.parametrize("recoverable", [False, True], ids=["plain", "recoverable"])
+@pytest.mark.parametrize("curve", curves, ids=curve_ids)
+def test(curve, recoverable):
+    items = []
+    for i in range(8):
+        priv = curve.new_private_key(is_compressed=True)
+        pub = curve.private_to_public(priv)
+        data = "Message {}".format(i).encode()
+        items.append((curve.sign(data, priv, recoverable=recoverable), data, pub))
+    assert curve.verify_batch(items) == [True] * 8
+
+    # Wrong data, wrong public key, malformed signature
+    signature, data, pub = items[0]
+    items.append((signature, b"Wrong data", pub))
+    items.append((signature, data, items[1][2]))
+    items.append((signature[:-1], data, pub))
+    items.append((b"\x00" * len(signature), data, pub))
+    assert curve.verify_batch(items) == [True] * 8 + [False] * 4
+    assert curve.verify_batch(items[::-1]) == [False] * 4 + [True] * 8
+    assert curve.verify_batch([]) == []
+
+
+@pytest.mark.parametrize("name", ["secp256k1", "prime256v1"])
+def test_large(name):
+    # Large batches are combined with Pippenger's method
+    curve = sslcrypto.fallback.ecc.get_curve(name)
+    privs = [curve.new_private_key() for _ in range(8)]
+    items = []
+    for i in range(80):
+        data = "Message {}".format(i).encode()
+        items.append((curve.sign(data, privs[i % 8], recoverable=True), data, curve.private_to_public(privs[i % 8])))
+    assert curve.verify_batch(items) == [True] * 80
+    items[37] = (items[37][0], b"Wrong data", items[37][2])
+    assert curve.verify_batch(items) == [True] * 37 + [False] + [True] * 42
+
+
+def test_malformed_items():
+    curve = sslcrypto.fallback.ecc.get_curve("secp256k1")
+    priv = curve.new_private_key()
+    pub = curve.private_to_public(priv)
+    signature = curve.sign(b"Hello, world!", priv)
+    items = [
+        (signature, b"Hello, world!", pub),
+        (signature, "Hello, world!", pub),
+        (signature, b"Hello, world!", None),
+        (None, b"Hello, world!", pub),
+        (signature, b"Hello, world!"),
+        (signature, b"Hello, world!", pub)
+    ]
+    assert curve.verify_batch(items) == [True, False, False, False, False, True]
+
+
+def test_recoverable_speedup():
+    # Recoverable signatures are combined into one check, which needs far
+    # fewer point operations than verifying them one by one. The timing
+    # itself is measured by sslcrypto.bench
+    curve = sslcrypto.fallback.ecc.get_curve("secp256k1")
+    priv = curve.new_private_key()
+    pub = curve.private_to_public(priv)
+    items = [(curve.sign(bytes([i]), priv, recoverable=True), bytes([i]), pub) for i in range(32)]
+    curve.verify_batch(items)
+
+    with instrument.profile() as stats:
+        for signature, data, public_key in items:
+            curve.verify(signature, data, public_key)
+    loop = stats.snapshot()["counters"]["secp256k1"]
+    with instrument.profile() as stats:
+        assert curve.verify_batch(items) == [True] * len(items)
+    batch = stats.snapshot()["counters"]["secp256k1"]
+
+    assert batch["double"] < loop["double"] / 4
+    assert batch["double"] + batch["add"] < (loop["double"] + loop["add"]) / 4
+    assert batch["inversion"] == 1
@@ -0,0 +1,63 @@
+import io
+import os
+import pytest
+import sslcrypto
+import sslcrypto.fallback
+
+
+curve = sslcrypto.fallback.ecc.get_curve("secp256k1")
+
+
+@pytest.mark.parametrize("algo", ["aes-256-cbc", "aes-128-ctr"])
+@pytest.mark.parametrize("mac", ["hmac-sha256", "hmac-sha512", None])
+def test_stream(algo, mac):
+    priv = curve.new_private_key()
+    pub = curve.private_to_public(priv)
+    data = bytes(range(256)) * 50
+
+    out = io.BytesIO()
+    curve.encrypt_stream(io.BytesIO(data), out, pub, algo=algo, mac=mac, chunk_size=1000)
+    ciphertext = out.getvalue()
+    assert curve.decrypt(ciphertext, priv, algo=algo, mac=mac) == data
+
+    ciphertext = curve.encrypt(data, pub, algo=algo, mac=mac)
+    out = io.BytesIO()
+    curve.decrypt_stream(io.BytesIO(ciphertext), out, priv, algo=algo, mac=mac, chunk_size=7)
+    assert out.getvalue() == data
+
+    # Iterables of chunks work too
+    out = io.BytesIO()
+    chunks = [ciphertext[i:i + 100] for i in range(0, len(ciphertext), 100)]
+    curve.decrypt_stream(iter(chunks), out, priv, algo=algo, mac=mac)
+    assert out.getvalue() == data
+
+
+def test_stream_tampered():
+    priv = curve.new_private_key()
+    pub = curve.private_to_public(priv)
+    ciphertext = bytearray(curve.encrypt(b"Hello, world!" * 100, pub))
+    ciphertext[200] ^= 1
+    out = io.BytesIO()
+    with pytest.raises(ValueError):
+        curve.decrypt_stream(io.BytesIO(bytes(ciphertext)), out, priv)
+    assert out.getvalue() == b""
+
+    with pytest.raises(ValueError):
+        curve.decrypt_stream(io.BytesIO(bytes(ciphertext[:20])), out, priv)
+    with pytest.raises(ValueError):
+        curve.encrypt_stream(io.BytesIO(b""), out, pub, mac=lambda key, data: b"")
+
+
+def test_iterable_reader():
+    # One large chunk read in small pieces
+    data = os.urandom(8 * 1024 * 1024 + 5)
+    reader = sslcrypto._ecc._IterableReader([data, b"", b"tail"])
+    pieces = []
+    while True:
+        piece = reader.read(4096)
+        if not piece:
+            break
+        assert isinstance(piece, bytes)
+        pieces.append(piece)
+    assert b"".join(pieces) == data + b"tail"
+    assert all(len(piece) == 4096 for piece in pieces[:-1])
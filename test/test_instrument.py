@@ -0,0 +1,59 @@
+import sslcrypto
+import sslcrypto.fallback
+from sslcrypto import instrument
+
+
+def test_profile():
+    curve = sslcrypto.fallback.ecc.get_curve("secp256k1")
+    private_key = curve.new_private_key()
+    public_key = curve.private_to_public(private_key)
+    ciphertext = curve.encrypt(b"Hello, world!", public_key)
+
+    events = []
+    with instrument.profile(callback=lambda *args: events.append(args)) as stats:
+        assert curve.decrypt(ciphertext, private_key) == b"Hello, world!"
+        # Curves created while profiling are instrumented too
+        sslcrypto.fallback.ecc.get_curve("secp112r1").private_to_public(b"\x01" * 14)
+    snapshot = stats.snapshot()
+
+    timings = snapshot["timings"]["secp256k1"]
+    assert timings["decrypt"]["count"] == 1
+    assert sum(timings["decrypt"]["histogram"]) == 1
+    assert timings["derive"]["count"] == 1
+    assert timings["hash"]["count"] == 1
+    assert snapshot["timings"]["aes"]["decrypt"]["count"] == 1
+    assert snapshot["timings"]["secp112r1"]["private_to_public"]["count"] == 1
+    counters = snapshot["counters"]["secp256k1"]
+    assert counters["add"] > 0 and counters["double"] > 0 and counters["inversion"] == 1
+    assert ("secp256k1", "decrypt", timings["decrypt"]["total"]) in events
+
+    # Nothing is wrapped or recorded afterwards
+    assert not instrument.is_enabled()
+    assert "decrypt" not in vars(curve)
+    assert "jacobian_add" not in vars(curve._backend.jacobian)
+    curve.decrypt(ciphertext, private_key)
+    assert stats.snapshot() == snapshot
+
+
+def test_enable():
+    curve = sslcrypto.fallback.ecc.get_curve("secp256k1")
+    instrument.reset()
+    instrument.enable()
+    try:
+        curve.sign(b"Hello", curve.new_private_key())
+    finally:
+        instrument.disable()
+    assert instrument.stats()["timings"]["secp256k1"]["sign"]["count"] == 1
+    instrument.reset()
+    assert instrument.stats() == {"timings": {}, "counters": {}}
+
+
+def test_field_specific_formulas():
+    # secp521r1 picks its point formulas per instance
+    curve = sslcrypto.fallback.ecc.get_curve("secp521r1")
+    jacobian = curve._backend.jacobian
+    add = vars(jacobian)["jacobian_add"]
+    with instrument.profile() as stats:
+        curve.private_to_public(curve.new_private_key())
+    assert stats.snapshot()["counters"]["secp521r1"]["add"] > 0
+    assert vars(jacobian)["jacobian_add"] == add
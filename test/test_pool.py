@@ -0,0 +1,55 @@
+import pickle
+import pytest
+import sslcrypto
+import sslcrypto.fallback
+
+
+curve = sslcrypto.fallback.ecc.get_curve("secp256k1")
+
+
+def test_pickle():
+    assert pickle.loads(pickle.dumps(curve)) is curve
+
+
+@pytest.mark.parametrize("workers", [None, 1, 2])
+def test_many(workers):
+    private_keys = [curve.new_private_key() for _ in range(10)]
+    public_keys = [curve.private_to_public(private_key) for private_key in private_keys]
+    prepared = curve.prepare_public_key(public_keys[0])
+    data = [b"Message %d" % i for i in range(10)]
+
+    signatures = curve.sign_many(zip(data, private_keys), workers=workers, recoverable=True)
+    assert signatures == [curve.sign(d, k, recoverable=True) for d, k in zip(data, private_keys)]
+
+    items = list(zip(signatures, data, public_keys))
+    items[3] = (signatures[3], b"Wrong", public_keys[3])
+    items.append((signatures[0], data[0], prepared))
+    items.append((signatures[0], data[0]))
+    assert curve.verify_many(items, workers=workers) == [i not in (3, 11) for i in range(12)]
+
+    shared = curve.derive_many(zip(private_keys, public_keys[::-1]), workers=workers)
+    assert shared == [curve.derive(k, p) for k, p in zip(private_keys, public_keys[::-1])]
+
+    ciphertexts = curve.encrypt_many(zip(data, public_keys), workers=workers, algo="aes-128-ctr")
+    assert curve.decrypt_many(zip(ciphertexts, private_keys), workers=workers, algo="aes-128-ctr") == data
+
+    with pytest.raises(ValueError):
+        curve.sign_many([(b"", b"")] * 3, workers=workers)
+
+
+def test_default_is_serial():
+    sslcrypto.shutdown_workers()
+    private_key = curve.new_private_key()
+    assert curve.sign_many([(b"Message", private_key)] * 3) == [curve.sign(b"Message", private_key)] * 3
+    assert sslcrypto._pool._executors == {}
+    curve.sign_many([(b"Message", private_key)] * 3, workers=2)
+    assert list(sslcrypto._pool._executors) == [2]
+    sslcrypto.shutdown_workers()
+    assert sslcrypto._pool._executors == {}
+
+
+def test_serial_keeps_prepared_table():
+    private_key = curve.new_private_key()
+    prepared = curve.prepare_public_key(curve.private_to_public(private_key))
+    curve.derive_many([(curve.new_private_key(), prepared)] * 2)
+    assert prepared._prepared._table is not None
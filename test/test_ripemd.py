@@ -0,0 +1,43 @@
+import os
+import pytest
+import sslcrypto
+from sslcrypto import _ripemd
+
+
+VECTORS = [
+    (b"", "9c1185a5c5e9fc54612808977ee8f548b2258d31"),
+    (b"a", "0bdc9d2d256b3ee9daae347be6f4dc835a467ffe"),
+    (b"abc", "8eb208f7e05d987a9b044a8e98c6b087f15a0bfc"),
+    (b"message digest", "5d0689ef49d2fae572b881b123a85ffa21595f36"),
+    (b"abcdefghijklmnopqrstuvwxyz", "f71c27109c692c1b56bbdceb5b9d2865b3708dbc"),
+    (b"abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq", "12a053384a9c0c88e405a06c27dcf49ada62eb2b"),
+    (b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789", "b0e20b6e3116640286ed3a87a5713079b21f5189"),
+    (b"1234567890" * 8, "9b752e45573d4b39f4dbd3323cab82bf63326bfb")
+]
+
+
+@pytest.mark.parametrize("data,digest", VECTORS)
+def test_vectors(data, digest):
+    assert _ripemd.new(data).hexdigest() == digest
+
+
+def test_incremental():
+    data = os.urandom(1000)
+    h = _ripemd.new()
+    for i in range(0, len(data), 7):
+        h.update(data[i:i + 7])
+        copy = h.copy()
+        assert copy.digest() == _ripemd.new(data[:i + 7]).digest()
+    assert h.digest() == _ripemd.new(data).digest()
+
+
+def test_many():
+    messages = [data for data, _ in VECTORS] + [os.urandom(n) for n in range(0, 150, 3)] + [os.urandom(32) for _ in range(300)]
+    assert _ripemd.ripemd160_many(messages) == [_ripemd.new(message).digest() for message in messages]
+    assert _ripemd.ripemd160_many([]) == []
+
+
+def test_addresses():
+    curve = sslcrypto.ecc.get_curve("secp256k1")
+    public_keys = [curve.private_to_public(curve.new_private_key()) for _ in range(5)]
+    assert curve.public_to_addresses(public_keys) == [curve.public_to_address(public_key) for public_key in public_keys]
@@ -114,3 +114,18 @@ def test_ecies():
 
 
     run()
+
+
+def test_get_curve():
+    curves = []
+
+    @parallelize(16)
+    def run():
+        for name in ecc.CURVES:
+            curves.append(ecc.get_curve(name))
+
+    run()
+    for name in ecc.CURVES:
+        assert len({id(c) for c in curves if c.name == name}) == 1
+        assert ecc.get_curve(name).name == name
+    assert ecc.get_curve("secp256k1") is curve
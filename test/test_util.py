@@ -0,0 +1,72 @@
+import os
+import pytest
+from sslcrypto.fallback._util import int_to_bytes, bytes_to_int, ints_to_bytes, bytes_to_ints, inverse, batch_inverse, isqrt, square_root_function, mersenne_reducer
+
+
+@pytest.mark.parametrize("length", [1, 14, 20, 32, 66])
+def test_conversion(length):
+    buf = os.urandom(2 * length)
+    r, s = bytes_to_ints(buf, length, 2)
+    assert ints_to_bytes((r, s), length) == buf
+    assert int_to_bytes(r, length) == buf[:length]
+    assert bytes_to_int(buf[length:], length) == s
+    assert int_to_bytes(0, length) == b"\x00" * length
+
+
+def test_conversion_errors():
+    with pytest.raises(ValueError):
+        int_to_bytes(256, 1)
+    with pytest.raises(ValueError):
+        bytes_to_int(b"\x00" * 3, 4)
+    with pytest.raises(ValueError):
+        bytes_to_ints(b"\x00" * 7, 4)
+    with pytest.raises(ValueError):
+        bytes_to_ints(b"\x00" * 12, 4, 2)
+
+
+def test_inverse():
+    p = 2 ** 256 - 2 ** 32 - 977
+    values = [0, 1, 2, p - 1, p + 5] + [bytes_to_int(os.urandom(32)) for _ in range(10)]
+    for value in values:
+        if value % p == 0:
+            assert inverse(value, p) == 0
+        else:
+            assert inverse(value, p) * value % p == 1
+    assert batch_inverse(values, p) == [inverse(value, p) for value in values]
+    assert batch_inverse(values[3:4], p) == [inverse(values[3], p)]
+    assert batch_inverse([], p) == []
+
+
+def test_isqrt():
+    values = list(range(300)) + [2 ** 521 - 1, 2 ** 256] + [bytes_to_int(os.urandom(66)) for _ in range(20)]
+    for value in values:
+        root = isqrt(value)
+        assert root * root <= value < (root + 1) * (root + 1)
+
+
+@pytest.mark.parametrize("p", [
+    7, 13, 17, 97, 257,
+    2 ** 224 - 2 ** 96 + 1,  # secp224r1, p = 1 (mod 2 ** 96)
+    2 ** 224 - 2 ** 32 - 6803,  # secp224k1, p = 5 (mod 8)
+    2 ** 256 - 2 ** 32 - 977  # secp256k1, p = 3 (mod 4)
+])
+def test_square_root(p):
+    square_root = square_root_function(p)
+    values = list(range(min(p, 200))) + [bytes_to_int(os.urandom(32)) % p for _ in range(50)]
+    for value in values:
+        if value == 0 or pow(value, (p - 1) // 2, p) == 1:
+            root = square_root(value)
+            assert root * root % p == value
+        else:
+            with pytest.raises(ValueError):
+                square_root(value)
+
+
+def test_mersenne_reducer():
+    assert mersenne_reducer(2 ** 256 - 2 ** 32 - 977) is None
+    p = 2 ** 521 - 1
+    reduce = mersenne_reducer(p)
+    values = [0, 1, p - 1, p, p + 1, -1, -p, -p - 1, p * p, -(p * p), 2 ** 1100, -(2 ** 1100)]
+    values += [bytes_to_int(os.urandom(130)) * (-1) ** i for i in range(100)]
+    for value in values:
+        assert reduce(value) == value % p